@@ -0,0 +1,152 @@
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from app.database import AsyncSessionLocal, ShardSessionLocal, shard_engines, shard_read_engines, Base
+import app.models  # noqa: F401  (registers every table on Base.metadata)
+from app.services.account import raise_account_number_sequence
+from app.services.archive import archive_transactions, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from app.services.rebalance import rebalance_shards, RebalanceError
+from app.services.reconcile import reconcile, RECONCILE_CHUNK_SIZE, RECONCILE_CONCURRENCY
+from app.services.schema import upgrade_schema
+from app.services.shards import prepare_shards
+from app.services.standing_order import run_due_orders, STANDING_ORDER_BATCH_SIZE
+from app.services.rollup import rebuild_rollups
+from app.services.ledger_import import import_ledger, recompute_balances, LedgerImportError, IMPORT_CHUNK_SIZE
+import sys
+
+async def _prepare():
+    for shard_engine in shard_engines:
+        async with shard_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade_schema)
+    await prepare_shards()
+    await raise_account_number_sequence()
+
+async def cmd_rebuild_rollups(args):
+    await _prepare()
+    count = 0
+    for session_factory in ShardSessionLocal:
+        async with session_factory() as session:
+            count += await rebuild_rollups(session)
+    print(f"Rebuilt {count} rollup rows")
+
+async def cmd_recompute_balances(args):
+    await _prepare()
+    count = 0
+    for session_factory in ShardSessionLocal:
+        async with session_factory() as session:
+            count += await recompute_balances(session)
+    print(f"Recomputed {count} account balances")
+
+async def cmd_import_ledger(args):
+    await _prepare()
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+    async with AsyncSessionLocal() as session:
+        try:
+            await import_ledger(session, args.path, file_format, args.chunk_size, args.source)
+        except LedgerImportError as exc:
+            print(f"Import stopped: {exc}. Fix the record and re-run to resume.", file=sys.stderr)
+            raise SystemExit(1)
+        if not args.no_recompute:
+            count = await recompute_balances(session)
+            print(f"Recomputed {count} account balances")
+            count = await rebuild_rollups(session)
+            print(f"Rebuilt {count} rollup rows")
+    # imported accounts land on the primary; rebalance-shards spreads them out
+    await prepare_shards()
+
+async def cmd_archive_ledger(args):
+    await _prepare()
+    if args.older_than_days <= 0:
+        print("Nothing to do: --older-than-days must be above 0", file=sys.stderr)
+        raise SystemExit(1)
+    older_than = datetime.utcnow() - timedelta(days=args.older_than_days)
+    count = 0
+    for session_factory in ShardSessionLocal:
+        async with session_factory() as session:
+            count += await archive_transactions(session, older_than, args.batch_size)
+    print(f"Archived {count} ledger rows")
+
+async def cmd_run_standing_orders(args):
+    await _prepare()
+    count = 0
+    for shard in range(len(ShardSessionLocal)):
+        count += await run_due_orders(shard, batch_size=args.batch_size)
+    print(f"Ran {count} standing orders")
+
+async def cmd_rebalance_shards(args):
+    await _prepare()
+    try:
+        count = await rebalance_shards(args.dry_run, args.limit)
+    except RebalanceError as exc:
+        print(f"Rebalance stopped: {exc}. Re-run to continue.", file=sys.stderr)
+        raise SystemExit(1)
+    print(f"{'Would move' if args.dry_run else 'Moved'} {count} accounts")
+
+async def cmd_reconcile(args):
+    await _prepare()
+    checked, mismatches = await reconcile(args.chunk_size, args.concurrency)
+    for mismatch in mismatches:
+        print(
+            f"account {mismatch.account_id} ({mismatch.account_number}, shard {mismatch.shard}): "
+            f"balance {mismatch.balance}, ledger {mismatch.expected}, drift {mismatch.drift:+}"
+        )
+    print(f"Checked {checked} accounts, {len(mismatches)} mismatched")
+    if mismatches:
+        raise SystemExit(1)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Bank system maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rebuild = commands.add_parser("rebuild-rollups", help="Recompute daily account rollups from the ledger")
+    rebuild.set_defaults(handler=cmd_rebuild_rollups)
+
+    recompute = commands.add_parser("recompute-balances", help="Set every account balance to the net of its ledger")
+    recompute.set_defaults(handler=cmd_recompute_balances)
+
+    importer = commands.add_parser("import-ledger", help="Bulk-load users, accounts and transactions from CSV/NDJSON")
+    importer.add_argument("path", help="input file, records ordered users -> accounts -> transactions")
+    importer.add_argument("--format", choices=["csv", "ndjson"], help="defaults to the file extension")
+    importer.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE, help="records validated and committed per batch")
+    importer.add_argument("--source", help="checkpoint name, defaults to the path; re-running resumes after the last committed chunk")
+    importer.add_argument("--no-recompute", action="store_true", help="skip the balance recompute and rollup rebuild")
+    importer.set_defaults(handler=cmd_import_ledger)
+
+    archiver = commands.add_parser("archive-ledger", help="Move old completed and failed transactions to the archive table")
+    archiver.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS or 365, help="minimum row age")
+    archiver.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="rows moved per commit")
+    archiver.set_defaults(handler=cmd_archive_ledger)
+
+    orders = commands.add_parser("run-standing-orders", help="Execute every standing order that is due now")
+    orders.add_argument("--batch-size", type=int, default=STANDING_ORDER_BATCH_SIZE, help="orders run per commit")
+    orders.set_defaults(handler=cmd_run_standing_orders)
+
+    rebalance = commands.add_parser("rebalance-shards", help="Move accounts to the shard their id maps to (run offline)")
+    rebalance.add_argument("--dry-run", action="store_true", help="only list the moves")
+    rebalance.add_argument("--limit", type=int, help="move at most this many accounts")
+    rebalance.set_defaults(handler=cmd_rebalance_shards)
+
+    checker = commands.add_parser("reconcile", help="Compare every balance with its ledger and report drift")
+    checker.add_argument("--chunk-size", type=int, default=RECONCILE_CHUNK_SIZE, help="account ids per range query")
+    checker.add_argument("--concurrency", type=int, default=RECONCILE_CONCURRENCY, help="ranges checked at once")
+    checker.set_defaults(handler=cmd_reconcile)
+
+    return parser
+
+async def _run(args):
+    try:
+        await args.handler(args)
+    finally:
+        for shard_engine in shard_engines + shard_read_engines:
+            await shard_engine.dispose()
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # progress from the services goes through their module loggers, to stderr
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(_run(args))
+
+if __name__ == "__main__":
+    main()
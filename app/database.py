@@ -1,3 +1,5 @@
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
 from dotenv import load_dotenv
@@ -6,8 +8,65 @@ import os
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# optional replica for read-only traffic; defaults to the primary database
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL") or DATABASE_URL
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# extra account shards; shard 0 is always DATABASE_URL, which also holds users and the shard directory
+SHARD_DATABASE_URLS = [url.strip() for url in os.getenv("SHARD_DATABASE_URLS", "").split(",") if url.strip()]
+
+# statement logging is expensive on the hot path, keep it opt-in
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() == "true"
+
+# server databases (PostgreSQL/MySQL) pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+# SQLite pragmas
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+# negative values are KiB, as in PRAGMA cache_size
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def _apply_sqlite_pragmas(sync_engine, read_only: bool = False):
+    @event.listens_for(sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+def build_engine(url: str, read_only: bool = False):
+    if is_sqlite(url):
+        engine = create_async_engine(url, echo=DB_ECHO)
+        _apply_sqlite_pragmas(engine.sync_engine, read_only)
+        return engine
+    return create_async_engine(
+        url,
+        echo=DB_ECHO,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=True,
+    )
+
+engine = build_engine(DATABASE_URL)
+# in WAL mode a separate read-only SQLite engine never waits on the writer;
+# an in-memory database cannot be shared across engines, so it reuses the primary
+if READ_DATABASE_URL == DATABASE_URL and is_sqlite(DATABASE_URL) and make_url(DATABASE_URL).database in (None, "", ":memory:"):
+    read_engine = engine
+else:
+    read_engine = build_engine(READ_DATABASE_URL, read_only=True)
 
 AsyncSessionLocal = sessionmaker(
     bind=engine,
@@ -15,8 +74,32 @@ AsyncSessionLocal = sessionmaker(
     expire_on_commit=False
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
+)
+
+# one writer and one reader session factory per shard; index 0 is the primary database
+shard_engines = [engine] + [build_engine(url) for url in SHARD_DATABASE_URLS]
+shard_read_engines = [read_engine] + [build_engine(url, read_only=True) for url in SHARD_DATABASE_URLS]
+SHARD_COUNT = len(shard_engines)
+
+ShardSessionLocal = [AsyncSessionLocal] + [
+    sessionmaker(bind=shard_engine, class_=AsyncSession, expire_on_commit=False)
+    for shard_engine in shard_engines[1:]
+]
+ShardReadSessionLocal = [ReadSessionLocal] + [
+    sessionmaker(bind=shard_engine, class_=AsyncSession, expire_on_commit=False)
+    for shard_engine in shard_read_engines[1:]
+]
+
 Base = declarative_base()
 
 async def get_db():
     async with AsyncSessionLocal() as session:
         yield session
+
+async def get_read_db():
+    async with ReadSessionLocal() as session:
+        yield session
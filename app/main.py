@@ -1,18 +1,60 @@
 from fastapi import FastAPI
-from app.database import engine, Base
+from app.database import Base, shard_engines, shard_read_engines
 from app.models import User, Account, Transaction
-from app.routes import auth, accounts, transactions
+from app.routes import auth, accounts, transactions, standing_orders, metrics
+from app.services.account import raise_account_number_sequence
+from app.services.metrics import MetricsMiddleware, instrument_engine
+from app.services.auth import shutdown_hash_pool
+from app.services.group_commit import group_committer, GROUP_COMMIT_ENABLED
+from app.services.idempotency import start_sweeper, stop_sweeper
+from app.services.statement import start_snapshotter, stop_snapshotter
+from app.services.archive import start_archiver, stop_archiver
+from app.services.schema import upgrade_schema
+from app.services.serialization import FastJSONResponse
+from app.services.shards import prepare_shards
+from app.services.transfer_outbox import start_relay, stop_relay
+from app.services.velocity import velocity_limits
+from app.services.standing_order import start_scheduler, stop_scheduler
 
-app = FastAPI(title="Bank Transaction System")
+app = FastAPI(title="Bank Transaction System", default_response_class=FastJSONResponse)
+
+for shard_engine in shard_engines + shard_read_engines:
+    instrument_engine(shard_engine)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(accounts.router)
 app.include_router(transactions.router)
+app.include_router(standing_orders.router)
+app.include_router(metrics.router)
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # every shard gets the full schema; only the primary holds users and the shard directory
+    for shard_engine in shard_engines:
+        async with shard_engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.run_sync(upgrade_schema)
+    await prepare_shards()
+    await raise_account_number_sequence()
+    await velocity_limits.rebuild()
+    if GROUP_COMMIT_ENABLED:
+        group_committer.start()
+    start_sweeper()
+    start_snapshotter()
+    start_archiver()
+    start_relay()
+    start_scheduler()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await group_committer.stop()
+    await stop_sweeper()
+    await stop_snapshotter()
+    await stop_archiver()
+    await stop_relay()
+    await stop_scheduler()
+    shutdown_hash_pool()
 
 @app.get("/")
 async def root():
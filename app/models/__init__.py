@@ -1,3 +1,9 @@
 from app.models.user import User
-from app.models.account import Account
-from app.models.transaction import Transaction
+from app.models.account import Account, AccountNumberSequence, AccountShard
+from app.models.transaction import Transaction, ArchivedTransaction
+from app.models.idempotency import IdempotencyKey
+from app.models.snapshot import BalanceSnapshot
+from app.models.rollup import AccountDailyRollup
+from app.models.import_checkpoint import ImportCheckpoint
+from app.models.transfer_outbox import TransferOutbox, TransferInbox
+from app.models.standing_order import StandingOrder
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
@@ -10,13 +10,29 @@ class AccountType(str, enum.Enum):
 
 class Account(Base):
     __tablename__ = "accounts"
+    # load created_at in the INSERT itself (RETURNING) so new accounts need no refresh()
+    __mapper_args__ = {"eager_defaults": True}
 
     id = Column(Integer, primary_key=True, index=True)
     account_number = Column(String(20), unique=True, index=True, nullable=False)
     account_type = Column(Enum(AccountType), default=AccountType.savings)
     balance = Column(Numeric(precision=15, scale=2), default=0.00)
-    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # no foreign key: users live on the primary only, accounts on any shard
+    owner_id = Column(Integer, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
-    owner = relationship("User", back_populates="accounts")
+    owner = relationship("User", back_populates="accounts", primaryjoin="foreign(Account.owner_id) == User.id")
     transactions = relationship("Transaction", back_populates="account")
+
+class AccountNumberSequence(Base):
+    __tablename__ = "account_number_sequences"
+
+    id = Column(Integer, primary_key=True)
+    next_value = Column(Integer, nullable=False, default=0)
+
+class AccountShard(Base):
+    # shard directory, kept on the primary database; accounts without a row live on shard 0
+    __tablename__ = "account_shards"
+
+    account_id = Column(Integer, primary_key=True, autoincrement=False)
+    shard = Column(Integer, nullable=False)
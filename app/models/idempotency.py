@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
+from sqlalchemy.sql import func
+from app.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String(255), nullable=False)
+    # no foreign key: keys live on the account's shard, users on the primary only
+    user_id = Column(Integer, nullable=False)
+    endpoint = Column(String(50), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    response = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    expires_at = Column(DateTime, nullable=False, index=True)
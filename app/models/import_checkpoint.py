@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ImportCheckpoint(Base):
+    __tablename__ = "import_checkpoints"
+
+    source = Column(String(255), primary_key=True)
+    # number of input records already committed; written in the same commit as the chunk
+    records_done = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, Numeric, ForeignKey, Date, Enum, UniqueConstraint
+from app.database import Base
+from app.models.transaction import TransactionType, TransactionStatus
+
+class AccountDailyRollup(Base):
+    __tablename__ = "account_daily_rollups"
+    __table_args__ = (
+        UniqueConstraint("account_id", "day", "transaction_type", "status", name="uq_account_daily_rollups_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    day = Column(Date, nullable=False)
+    transaction_type = Column(Enum(TransactionType), nullable=False)
+    status = Column(Enum(TransactionStatus), nullable=False)
+    txn_count = Column(Integer, nullable=False, default=0)
+    amount_total = Column(Numeric(precision=15, scale=2), nullable=False, default=0)
+    inflow = Column(Numeric(precision=15, scale=2), nullable=False, default=0)
+    outflow = Column(Numeric(precision=15, scale=2), nullable=False, default=0)
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Numeric, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from app.database import Base
+
+class BalanceSnapshot(Base):
+    __tablename__ = "balance_snapshots"
+    __table_args__ = (
+        Index("ix_balance_snapshots_account_txn", "account_id", "last_transaction_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    # balance after applying every ledger row with id <= last_transaction_id
+    balance = Column(Numeric(precision=15, scale=2), nullable=False)
+    last_transaction_id = Column(Integer, nullable=False)
+    # created_at of that last ledger row, i.e. the point in time the balance is valid for
+    taken_at = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Enum, Boolean, Index
+from sqlalchemy.sql import func
+import enum
+from app.database import Base
+
+class Frequency(str, enum.Enum):
+    daily = "daily"
+    weekly = "weekly"
+    monthly = "monthly"
+
+class RunStatus(str, enum.Enum):
+    completed = "completed"
+    failed = "failed"
+
+class StandingOrder(Base):
+    # Recurring transfer, stored on the source account's shard so a run commits with its debit
+    __tablename__ = "standing_orders"
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # serves the scheduler: WHERE active AND next_run_at <= now ORDER BY next_run_at
+        Index("ix_standing_orders_due", "active", "next_run_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    owner_id = Column(Integer, nullable=False)
+    from_account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False, index=True)
+    to_account_id = Column(Integer, nullable=False)
+    amount = Column(Numeric(precision=15, scale=2), nullable=False)
+    description = Column(String(255), nullable=True)
+    frequency = Column(Enum(Frequency), nullable=False)
+    # monthly orders run on starts_at's day of month (or the month's last day)
+    starts_at = Column(DateTime, nullable=False)
+    next_run_at = Column(DateTime, nullable=False)
+    ends_at = Column(DateTime, nullable=True)
+    active = Column(Boolean, nullable=False, default=True)
+    last_run_at = Column(DateTime, nullable=True)
+    last_status = Column(Enum(RunStatus), nullable=True)
+    last_error = Column(String(255), nullable=True)
+    # consecutive failed runs
+    failed_runs = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
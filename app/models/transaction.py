@@ -1,6 +1,9 @@
-from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey, DateTime, Enum, Index, and_, case, or_
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
+from decimal import Decimal
+from typing import Optional
 import enum
 from app.database import Base
 
@@ -14,15 +17,80 @@ class TransactionStatus(str, enum.Enum):
     completed = "completed"
     failed = "failed"
 
+class EntryDirection(str, enum.Enum):
+    # which side of the account a ledger row hits: debits lower the balance, credits raise it
+    debit = "debit"
+    credit = "credit"
+
+# SQLite keeps timestamps as text and compares them as strings. CURRENT_TIMESTAMP writes whole
+# seconds, so ledger times bound from Python are written the same way: "12:00:05" and
+# "12:00:05.000000" would otherwise sort apart and keyset cursors would match their own rows again.
+LedgerTimestamp = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
 class Transaction(Base):
     __tablename__ = "transactions"
+    __table_args__ = (
+        # serves keyset-paginated history: WHERE account_id = ? ORDER BY created_at, id
+        Index("ix_transactions_account_created", "account_id", "created_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     amount = Column(Numeric(precision=15, scale=2), nullable=False)
     transaction_type = Column(Enum(TransactionType), nullable=False)
     status = Column(Enum(TransactionStatus), default=TransactionStatus.pending)
+    direction = Column(Enum(EntryDirection), nullable=False)
     description = Column(String(255), nullable=True)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
-    created_at = Column(DateTime, server_default=func.now())
+    created_at = Column(LedgerTimestamp, server_default=func.now())
 
     account = relationship("Account", back_populates="transactions")
+
+class ArchivedTransaction(Base):
+    # Cold tier: completed ledger rows moved out of `transactions` by app.services.archive.
+    # Ids are kept, and every archived id is below every id still in the hot table.
+    __tablename__ = "transactions_archive"
+    __table_args__ = (
+        Index("ix_transactions_archive_account_created", "account_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    amount = Column(Numeric(precision=15, scale=2), nullable=False)
+    transaction_type = Column(Enum(TransactionType), nullable=False)
+    status = Column(Enum(TransactionStatus), nullable=False)
+    direction = Column(Enum(EntryDirection), nullable=False)
+    description = Column(String(255), nullable=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
+    created_at = Column(LedgerTimestamp, nullable=True)
+    archived_at = Column(DateTime, server_default=func.now())
+
+# oldest tier first: reading the tiers in this order yields ascending ids
+LEDGER_TIERS = (ArchivedTransaction, Transaction)
+
+def signed_amount(tier=Transaction):
+    # SQL expression for a tier row's effect on its account balance
+    return case((tier.direction == EntryDirection.debit, -tier.amount), else_=tier.amount)
+
+def signed_value(txn) -> Decimal:
+    # Python counterpart of signed_amount() for rows already loaded
+    amount = Decimal(str(txn.amount))
+    return -amount if txn.direction == EntryDirection.debit else amount
+
+def infer_direction(transaction_type: TransactionType, description: Optional[str]) -> EntryDirection:
+    # For rows written before the direction column existed: both transfer legs share
+    # TransactionType.transfer, and the debit leg is the one described "Transfer to ...".
+    if transaction_type == TransactionType.withdrawal:
+        return EntryDirection.debit
+    if transaction_type == TransactionType.transfer and (description or "").startswith("Transfer to "):
+        return EntryDirection.debit
+    return EntryDirection.credit
+
+def inferred_direction(tier=Transaction):
+    # SQL counterpart of infer_direction(), used to backfill the column in place
+    is_debit = or_(
+        tier.transaction_type == TransactionType.withdrawal,
+        and_(tier.transaction_type == TransactionType.transfer, tier.description.like("Transfer to %")),
+    )
+    return case((is_debit, EntryDirection.debit.name), else_=EntryDirection.credit.name)
@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, Numeric, DateTime, Enum
+from sqlalchemy.sql import func
+import enum
+from app.database import Base
+
+class OutboxStatus(str, enum.Enum):
+    pending = "pending"
+    delivered = "delivered"
+    reversed = "reversed"
+
+class TransferOutbox(Base):
+    # Cross-shard transfer, written on the source shard in the same commit as the debit.
+    # The relay delivers the credit to the destination shard and then marks the row delivered.
+    __tablename__ = "transfer_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    from_account_id = Column(Integer, nullable=False)
+    from_account_number = Column(String(20), nullable=False)
+    to_account_id = Column(Integer, nullable=False)
+    amount = Column(Numeric(precision=15, scale=2), nullable=False)
+    debit_transaction_id = Column(Integer, nullable=False)
+    # the transfer's own description, repeated on the credit row
+    description = Column(String(255), nullable=True)
+    status = Column(Enum(OutboxStatus), nullable=False, default=OutboxStatus.pending, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class TransferInbox(Base):
+    # Destination-side record of applied outbox rows; makes redelivery a no-op
+    __tablename__ = "transfer_inbox"
+
+    source_shard = Column(Integer, primary_key=True, autoincrement=False)
+    outbox_id = Column(Integer, primary_key=True, autoincrement=False)
+    credit_transaction_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, server_default=func.now())
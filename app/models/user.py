@@ -13,4 +13,4 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=func.now())
 
-    accounts = relationship("Account", back_populates="owner")
+    accounts = relationship("Account", back_populates="owner", primaryjoin="User.id == foreign(Account.owner_id)")
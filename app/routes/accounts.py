@@ -1,24 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
-from app.schemas.account import AccountCreate, AccountResponse
-from app.services.account import create_account, get_user_accounts
-from app.routes.auth import oauth2_scheme
-from app.services.auth import verify_token
-from app.services.user import get_user_by_email
-from typing import List
+from app.schemas.account import (
+    AccountCreate, AccountBulkCreate, AccountResponse, StatementResponse, AccountSummaryResponse, UserSummaryResponse
+)
+from app.services.account import create_account, create_accounts_bulk, list_user_accounts
+from app.services.statement import get_statement
+from app.services.analytics import get_account_summary, get_user_summary
+from app.services.export import stream_export
+from app.services.serialization import render, account_list_adapter
+from app.schemas.transaction import ExportFormat
+from app.routes.deps import get_current_user, get_account_read_db
+from datetime import date, datetime
+from typing import List, Optional
 
 router = APIRouter(prefix="/accounts", tags=["Accounts"])
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    token_data = verify_token(token)
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user = await get_user_by_email(db, token_data.email)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
-
 @router.post("/", response_model=AccountResponse, status_code=201)
 async def create_new_account(
     account_data: AccountCreate,
@@ -27,9 +25,63 @@ async def create_new_account(
 ):
     return await create_account(db, current_user.id, account_data)
 
-@router.get("/me", response_model=List[AccountResponse])
-async def get_my_accounts(
+@router.post("/bulk", response_model=List[AccountResponse], status_code=201)
+async def create_accounts_in_bulk(
+    account_data: AccountBulkCreate,
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    return await get_user_accounts(db, current_user.id)
+    accounts = await create_accounts_bulk(db, current_user.id, account_data)
+    return render(request, account_list_adapter, accounts, status_code=201)
+
+@router.get("/me", response_model=List[AccountResponse])
+async def get_my_accounts(request: Request, current_user = Depends(get_current_user)):
+    return render(request, account_list_adapter, await list_user_accounts(current_user.id))
+
+@router.get("/export")
+async def export_ledger(
+    export_format: ExportFormat = Query(ExportFormat.csv, alias="format"),
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to"),
+    gzip: bool = False,
+    current_user = Depends(get_current_user)
+):
+    media_type = "text/csv" if export_format == ExportFormat.csv else "application/x-ndjson"
+    filename = f"ledger.{export_format.value}"
+    if gzip:
+        media_type = "application/gzip"
+        filename += ".gz"
+    return StreamingResponse(
+        stream_export(current_user.id, export_format, from_date, to_date, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/summary", response_model=UserSummaryResponse)
+async def my_summary(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    current_user = Depends(get_current_user)
+):
+    return await get_user_summary(current_user.id, from_date, to_date)
+
+@router.get("/{account_id}/summary", response_model=AccountSummaryResponse)
+async def account_summary(
+    account_id: int,
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_account_read_db),
+    current_user = Depends(get_current_user)
+):
+    return await get_account_summary(db, account_id, current_user.id, from_date, to_date)
+
+@router.get("/{account_id}/statement", response_model=StatementResponse)
+async def get_account_statement(
+    account_id: int,
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_account_read_db),
+    current_user = Depends(get_current_user)
+):
+    return await get_statement(db, account_id, current_user.id, from_date, to_date)
@@ -1,15 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.database import get_db
 from app.schemas.user import UserCreate, UserResponse, Token
 from app.services.user import get_user_by_email, create_user
-from app.services.auth import verify_password, create_access_token, verify_token
+from app.services.auth import verify_and_update_password, verify_dummy_password, create_access_token
+from app.services.serialization import render, user_adapter
+from app.routes.deps import get_current_user
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
-
 # ── Register ──────────────────────────────────────────
 @router.post("/register", response_model=UserResponse, status_code=201)
 async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
@@ -31,28 +31,24 @@ async def login(
     # find user
     user = await get_user_by_email(db, form_data.username)
     if not user:
+        await verify_dummy_password(form_data.password)
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
-    # check password
-    if not verify_password(form_data.password, user.hashed_password):
+    # check password (off the event loop)
+    valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # transparently upgrade hashes made with a different bcrypt cost
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+
     # create token
     token = create_access_token(data={"sub": user.email})
     return {"access_token": token, "token_type": "bearer"}
 
 # ── Get current user (protected route example) ────────
 @router.get("/me", response_model=UserResponse)
-async def get_me(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-):
-    token_data = verify_token(token)
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-
-    user = await get_user_by_email(db, token_data.email)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    return user
+async def get_me(request: Request, current_user = Depends(get_current_user)):
+    return render(request, user_adapter, current_user)
@@ -0,0 +1,52 @@
+from fastapi import Depends, HTTPException
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
+from app.schemas.user import UserResponse
+from app.services.auth import verify_token
+from app.services.user import get_user_by_email
+from app.services.principal_cache import principal_cache
+from app.services.shards import account_session
+from app.services.admission import rate_limited, write_limiter
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
+    # cached principals skip both the JWT decode and the user lookup
+    user = principal_cache.get(token)
+    if user:
+        return user
+
+    token_data = verify_token(token)
+    if not token_data:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    db_user = await get_user_by_email(db, token_data.email)
+    if not db_user:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not db_user.is_active:
+        raise HTTPException(status_code=403, detail="Inactive user")
+
+    # cache a detached snapshot so concurrent requests never share an ORM instance
+    user = UserResponse.model_validate(db_user)
+    principal_cache.put(token, user, token_data.exp)
+    return user
+
+async def get_account_db(account_id: int):
+    # session on the shard that holds the path's account
+    async with account_session(account_id) as session:
+        yield session
+
+async def get_account_read_db(account_id: int):
+    async with account_session(account_id, read=True) as session:
+        yield session
+
+def rate_limit(route: str):
+    # token bucket per (user, route); shares the request's cached get_current_user
+    async def check(current_user = Depends(get_current_user)):
+        rate_limited(current_user.id, route)
+    return check
+
+async def write_slot():
+    # held for the whole request, so the global cap counts writes that are still running
+    async with write_limiter.slot():
+        yield
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from app.routes.deps import get_current_user
+from app.services.metrics import metrics, render_histogram
+from app.services.principal_cache import principal_cache
+from app.services.group_commit import group_committer
+from app.services.idempotency import replay_cache
+from app.services.events import transaction_hub
+from app.services.shards import shard_directory
+from app.services.admission import rate_limiter, write_limiter
+from app.services.velocity import velocity_limits
+from app.services.standing_order import run_counts
+
+router = APIRouter(tags=["Metrics"])
+
+def _component_metrics() -> list:
+    cache = principal_cache.stats()
+    lines = [
+        "# TYPE principal_cache_hits_total counter",
+        f"principal_cache_hits_total {cache['hits']}",
+        "# TYPE principal_cache_misses_total counter",
+        f"principal_cache_misses_total {cache['misses']}",
+        "# TYPE principal_cache_evictions_total counter",
+        f"principal_cache_evictions_total {cache['evictions']}",
+        "# TYPE principal_cache_invalidations_total counter",
+        f"principal_cache_invalidations_total {cache['invalidations']}",
+        "# TYPE principal_cache_size gauge",
+        f"principal_cache_size {cache['size']}",
+        "# TYPE principal_cache_max_size gauge",
+        f"principal_cache_max_size {cache['maxsize']}",
+        "# TYPE idempotency_cache_hits_total counter",
+        f"idempotency_cache_hits_total {replay_cache.hits}",
+        "# TYPE idempotency_cache_misses_total counter",
+        f"idempotency_cache_misses_total {replay_cache.misses}",
+        "# TYPE group_commit_failed_flushes_total counter",
+        f"group_commit_failed_flushes_total {group_committer.failed_flushes}",
+        "# TYPE group_commit_running gauge",
+        f"group_commit_running {int(group_committer.running)}",
+        "# TYPE group_commit_window_seconds gauge",
+        f"group_commit_window_seconds {group_committer.window}",
+        "# TYPE group_commit_max_batch gauge",
+        f"group_commit_max_batch {group_committer.max_batch}",
+        "# TYPE sse_subscribers gauge",
+        f"sse_subscribers {transaction_hub.subscriber_count}",
+        "# TYPE sse_dropped_subscribers_total counter",
+        f"sse_dropped_subscribers_total {transaction_hub.dropped_subscribers}",
+        "# TYPE shard_directory_hits_total counter",
+        f"shard_directory_hits_total {shard_directory.hits}",
+        "# TYPE shard_directory_misses_total counter",
+        f"shard_directory_misses_total {shard_directory.misses}",
+        "# TYPE write_limiter_in_flight gauge",
+        f"write_limiter_in_flight {write_limiter.in_flight}",
+        "# TYPE write_limiter_waiting gauge",
+        f"write_limiter_waiting {write_limiter.waiting}",
+        "# TYPE write_limiter_shed_total counter",
+        f"write_limiter_shed_total {write_limiter.shed}",
+        "# TYPE rate_limit_rejected_total counter",
+    ]
+    for route, count in sorted(rate_limiter.rejected.items()):
+        lines.append(f'rate_limit_rejected_total{{route="{route}"}} {count}')
+    lines.append("# TYPE velocity_limit_rejected_total counter")
+    for operation, count in sorted(velocity_limits.rejected.items()):
+        lines.append(f'velocity_limit_rejected_total{{operation="{operation}"}} {count}')
+    lines.append("# TYPE standing_order_runs_total counter")
+    for status, count in run_counts.items():
+        lines.append(f'standing_order_runs_total{{status="{status}"}} {count}')
+    lines.append("# TYPE group_commit_batch_size histogram")
+    render_histogram(lines, "group_commit_batch_size", group_committer.batch_sizes)
+    lines.append("# TYPE group_commit_flush_seconds histogram")
+    render_histogram(lines, "group_commit_flush_seconds", group_committer.flush_latency)
+    return lines
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    return PlainTextResponse(
+        metrics.render(_component_metrics()),
+        media_type="text/plain; version=0.0.4"
+    )
+
+@router.get("/metrics/slow-requests", include_in_schema=False)
+async def slow_requests(current_user = Depends(get_current_user)):
+    # carries captured SQL text, so unlike /metrics it is not open to anonymous scrapers
+    return list(metrics.slow_requests)
@@ -0,0 +1,57 @@
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.standing_order import StandingOrderCreate, StandingOrderUpdate, StandingOrderResponse
+from app.services.standing_order import (
+    create_standing_order, list_standing_orders, get_standing_order, update_standing_order, delete_standing_order
+)
+from app.routes.deps import get_current_user, get_account_db
+from typing import List
+
+# orders live with their source account, on that account's shard
+router = APIRouter(prefix="/accounts/{account_id}/standing-orders", tags=["Standing Orders"])
+
+@router.post("/", response_model=StandingOrderResponse, status_code=201)
+async def create_order(
+    account_id: int,
+    data: StandingOrderCreate,
+    db: AsyncSession = Depends(get_account_db),
+    current_user = Depends(get_current_user)
+):
+    return await create_standing_order(db, account_id, current_user.id, data)
+
+@router.get("/", response_model=List[StandingOrderResponse])
+async def list_orders(
+    account_id: int,
+    db: AsyncSession = Depends(get_account_db),
+    current_user = Depends(get_current_user)
+):
+    return await list_standing_orders(db, account_id, current_user.id)
+
+@router.get("/{order_id}", response_model=StandingOrderResponse)
+async def get_order(
+    account_id: int,
+    order_id: int,
+    db: AsyncSession = Depends(get_account_db),
+    current_user = Depends(get_current_user)
+):
+    return await get_standing_order(db, account_id, order_id, current_user.id)
+
+@router.patch("/{order_id}", response_model=StandingOrderResponse)
+async def update_order(
+    account_id: int,
+    order_id: int,
+    data: StandingOrderUpdate,
+    db: AsyncSession = Depends(get_account_db),
+    current_user = Depends(get_current_user)
+):
+    return await update_standing_order(db, account_id, order_id, current_user.id, data)
+
+@router.delete("/{order_id}", status_code=204)
+async def delete_order(
+    account_id: int,
+    order_id: int,
+    db: AsyncSession = Depends(get_account_db),
+    current_user = Depends(get_current_user)
+):
+    await delete_standing_order(db, account_id, order_id, current_user.id)
+    return Response(status_code=204)
@@ -1,52 +1,168 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import get_db
-from app.schemas.transaction import DepositWithdrawRequest, TransferRequest, TransactionResponse
-from app.services.transaction import deposit, withdraw, transfer, get_transaction_history
-from app.routes.auth import oauth2_scheme
-from app.services.auth import verify_token
-from app.services.user import get_user_by_email
-from typing import List
+from app.database import ShardSessionLocal, ShardReadSessionLocal
+from app.schemas.transaction import (
+    DepositWithdrawRequest, TransferRequest, TransactionResponse, BatchRequest, BatchResponse
+)
+from app.services.account import list_user_accounts
+from app.services.events import stream_events
+from app.services.group_commit import group_committer
+from app.services.idempotency import run_idempotent
+from app.services.serialization import render, transaction_list_adapter
+from app.services.shards import account_session, shard_directory
+from app.services.transaction import (
+    deposit, withdraw, apply_deposit, apply_withdraw, batch, batch_shard, get_owned_account, get_transaction_history, stream_transaction_history
+)
+from app.services.transfer_outbox import dispatch_transfer
+from app.routes.deps import get_current_user, get_account_read_db, rate_limit, write_slot
+from datetime import datetime
+from typing import List, Optional
 
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
-    token_data = verify_token(token)
-    if not token_data:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    user = await get_user_by_email(db, token_data.email)
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+# deposits and withdrawals open a session on the account's shard, so they only touch that shard.
+# Money-movement routes are rate limited per user and hold a global write slot while they run.
 
-@router.post("/deposit", response_model=TransactionResponse)
+@router.post(
+    "/deposit",
+    response_model=TransactionResponse,
+    dependencies=[Depends(rate_limit("deposit")), Depends(write_slot)]
+)
 async def make_deposit(
     data: DepositWithdrawRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
-    return await deposit(db, data, current_user.id)
+    if group_committer.running and not idempotency_key:
+        return await group_committer.submit(apply_deposit, data, current_user.id)
+    async with account_session(data.account_id) as db:
+        if idempotency_key:
+            return await run_idempotent(db, current_user.id, idempotency_key, "deposit", data, apply_deposit)
+        return await deposit(db, data, current_user.id)
 
-@router.post("/withdraw", response_model=TransactionResponse)
+@router.post(
+    "/withdraw",
+    response_model=TransactionResponse,
+    dependencies=[Depends(rate_limit("withdraw")), Depends(write_slot)]
+)
 async def make_withdrawal(
     data: DepositWithdrawRequest,
-    db: AsyncSession = Depends(get_db),
-    current_user = Depends(get_current_user)
+    current_user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
-    return await withdraw(db, data, current_user.id)
+    if group_committer.running and not idempotency_key:
+        return await group_committer.submit(apply_withdraw, data, current_user.id)
+    async with account_session(data.account_id) as db:
+        if idempotency_key:
+            return await run_idempotent(db, current_user.id, idempotency_key, "withdraw", data, apply_withdraw)
+        return await withdraw(db, data, current_user.id)
 
-@router.post("/transfer", response_model=TransactionResponse)
+@router.post(
+    "/transfer",
+    response_model=TransactionResponse,
+    dependencies=[Depends(rate_limit("transfer")), Depends(write_slot)]
+)
 async def make_transfer(
     data: TransferRequest,
-    db: AsyncSession = Depends(get_db),
+    current_user = Depends(get_current_user),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    return await dispatch_transfer(data, current_user.id, idempotency_key)
+
+@router.post(
+    "/batch",
+    response_model=BatchResponse,
+    dependencies=[Depends(rate_limit("batch")), Depends(write_slot)]
+)
+async def make_batch(
+    data: BatchRequest,
     current_user = Depends(get_current_user)
 ):
-    return await transfer(db, data, current_user.id)
+    async with ShardSessionLocal[await batch_shard(data)]() as db:
+        return await batch(db, data, current_user.id)
 
 @router.get("/history/{account_id}", response_model=List[TransactionResponse])
 async def transaction_history(
     account_id: int,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    limit: int = Query(50, ge=1, le=500),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_account_read_db),
+    current_user = Depends(get_current_user)
+):
+    rows, next_cursor, prev_cursor = await get_transaction_history(
+        db, account_id, current_user.id, limit, before, after, from_date, to_date
+    )
+    headers = {}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if prev_cursor:
+        headers["X-Prev-Cursor"] = prev_cursor
+    return render(request, transaction_list_adapter, rows, headers=headers)
+
+@router.get("/history/{account_id}/stream")
+async def transaction_history_stream(
+    account_id: int,
+    from_date: Optional[datetime] = Query(None, alias="from"),
+    to_date: Optional[datetime] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_account_read_db),
+    current_user = Depends(get_current_user)
+):
+    await get_owned_account(db, account_id, current_user.id)
+    return StreamingResponse(
+        stream_transaction_history(account_id, from_date, to_date),
+        media_type="application/x-ndjson"
+    )
+
+def _resume_from(last_event_id: Optional[str], since: Optional[int]) -> Optional[int]:
+    # browsers send Last-Event-ID on reconnect; ?since= is the explicit form
+    if since is not None:
+        return since
+    if last_event_id:
+        try:
+            return int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    return None
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+@router.get("/events")
+async def user_transaction_events(
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    current_user = Depends(get_current_user)
+):
+    account_ids = [account.id for account in await list_user_accounts(current_user.id)]
+    shards = {await shard_directory.shard_for(account_id) for account_id in account_ids}
+    resume = _resume_from(last_event_id, since)
+    if resume is not None and len(shards) > 1:
+        # transaction ids are only ordered within one shard
+        raise HTTPException(status_code=400, detail="Accounts span several shards; resume per account via /transactions/events/{account_id}")
+    return StreamingResponse(
+        stream_events(request, account_ids, resume, ShardReadSessionLocal[min(shards, default=0)]),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+@router.get("/events/{account_id}")
+async def account_transaction_events(
+    account_id: int,
+    request: Request,
+    since: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+    db: AsyncSession = Depends(get_account_read_db),
     current_user = Depends(get_current_user)
 ):
-    return await get_transaction_history(db, account_id, current_user.id)
+    await get_owned_account(db, account_id, current_user.id)
+    shard = await shard_directory.shard_for(account_id)
+    return StreamingResponse(
+        stream_events(request, [account_id], _resume_from(last_event_id, since), ShardReadSessionLocal[shard]),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
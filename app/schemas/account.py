@@ -1,7 +1,9 @@
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from datetime import date, datetime
+from decimal import Decimal
 from enum import Enum
+from app.schemas.transaction import TransactionResponse
 
 class AccountType(str, Enum):
     savings = "savings"
@@ -10,13 +12,46 @@ class AccountType(str, Enum):
 class AccountCreate(BaseModel):
     account_type: AccountType = AccountType.savings
 
+class AccountBulkCreate(BaseModel):
+    account_type: AccountType = AccountType.savings
+    count: int = Field(..., ge=1, le=1000)
+
 class AccountResponse(BaseModel):
     id: int
     account_number: str
     account_type: AccountType
-    balance: float
+    balance: Decimal
     owner_id: int
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+class StatementResponse(BaseModel):
+    account_id: int
+    period_start: Optional[datetime]
+    period_end: Optional[datetime]
+    opening_balance: Decimal
+    closing_balance: Decimal
+    transactions: List[TransactionResponse]
+
+class DailyFlow(BaseModel):
+    day: date
+    inflow: Decimal
+    outflow: Decimal
+
+class SummaryResponse(BaseModel):
+    period_start: Optional[date]
+    period_end: Optional[date]
+    totals_by_type: Dict[str, Decimal]
+    counts_by_type: Dict[str, int]
+    counts_by_status: Dict[str, int]
+    inflow: Decimal
+    outflow: Decimal
+    daily: List[DailyFlow]
+
+class AccountSummaryResponse(SummaryResponse):
+    account_id: int
+
+class UserSummaryResponse(SummaryResponse):
+    account_ids: List[int]
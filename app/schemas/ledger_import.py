@@ -0,0 +1,35 @@
+from pydantic import BaseModel, EmailStr, Field
+from typing import Literal, Optional
+from datetime import datetime
+from decimal import Decimal
+from app.schemas.account import AccountType
+from app.schemas.transaction import TransactionType, TransactionStatus, EntryDirection
+
+# one line of a migration file; "type" selects the record kind
+class ImportUser(BaseModel):
+    type: Literal["user"]
+    id: int
+    full_name: str
+    email: EmailStr
+    hashed_password: str
+    is_active: bool = True
+
+class ImportAccount(BaseModel):
+    type: Literal["account"]
+    id: int
+    account_number: str
+    account_type: AccountType = AccountType.savings
+    owner_id: int
+
+class ImportTransaction(BaseModel):
+    type: Literal["transaction"]
+    id: int
+    account_id: int
+    # the sign comes from direction, never from the amount
+    amount: Decimal = Field(..., gt=0)
+    transaction_type: TransactionType
+    status: TransactionStatus = TransactionStatus.completed
+    # older exports have no direction; it is then inferred from the type and description
+    direction: Optional[EntryDirection] = None
+    description: Optional[str] = None
+    created_at: datetime
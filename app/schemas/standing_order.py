@@ -0,0 +1,50 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+
+class Frequency(str, Enum):
+    daily = "daily"
+    weekly = "weekly"
+    monthly = "monthly"
+
+class RunStatus(str, Enum):
+    completed = "completed"
+    failed = "failed"
+
+class StandingOrderCreate(BaseModel):
+    to_account_id: int
+    amount: Decimal
+    frequency: Frequency
+    starts_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    description: Optional[str] = None
+
+class StandingOrderUpdate(BaseModel):
+    amount: Optional[Decimal] = None
+    frequency: Optional[Frequency] = None
+    next_run_at: Optional[datetime] = None
+    ends_at: Optional[datetime] = None
+    description: Optional[str] = None
+    active: Optional[bool] = None
+
+class StandingOrderResponse(BaseModel):
+    id: int
+    from_account_id: int
+    to_account_id: int
+    amount: Decimal
+    description: Optional[str]
+    frequency: Frequency
+    starts_at: datetime
+    next_run_at: datetime
+    ends_at: Optional[datetime]
+    active: bool
+    last_run_at: Optional[datetime]
+    last_status: Optional[RunStatus]
+    last_error: Optional[str]
+    failed_runs: int
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
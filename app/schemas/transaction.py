@@ -1,5 +1,5 @@
-from pydantic import BaseModel, condecimal
-from typing import Optional
+from pydantic import BaseModel, Field, condecimal
+from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 from decimal import Decimal
@@ -14,6 +14,10 @@ class TransactionStatus(str, Enum):
     completed = "completed"
     failed = "failed"
 
+class EntryDirection(str, Enum):
+    debit = "debit"
+    credit = "credit"
+
 class DepositWithdrawRequest(BaseModel):
     account_id: int
     amount: Decimal
@@ -30,9 +34,47 @@ class TransactionResponse(BaseModel):
     amount: Decimal
     transaction_type: TransactionType
     status: TransactionStatus
+    direction: Optional[EntryDirection] = None
     description: Optional[str]
     account_id: int
     created_at: datetime
 
     class Config:
         from_attributes = True
+
+class BatchOperation(str, Enum):
+    deposit = "deposit"
+    withdraw = "withdraw"
+    transfer = "transfer"
+
+class BatchMode(str, Enum):
+    atomic = "atomic"
+    best_effort = "best_effort"
+
+class BatchItem(BaseModel):
+    operation: BatchOperation
+    account_id: int
+    to_account_id: Optional[int] = None
+    amount: Decimal
+    description: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    mode: BatchMode = BatchMode.atomic
+    items: List[BatchItem] = Field(..., min_length=1, max_length=10000)
+
+class BatchItemResult(BaseModel):
+    index: int
+    success: bool
+    transaction_id: Optional[int] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    mode: BatchMode
+    committed: bool
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
@@ -27,3 +27,4 @@ class Token(BaseModel):
 # data stored inside the token
 class TokenData(BaseModel):
     email: Optional[str] = None
+    exp: Optional[int] = None
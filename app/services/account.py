@@ -1,42 +1,208 @@
+from decimal import Decimal
+from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from app.models.account import Account
-from app.schemas.account import AccountCreate
-import random
-import string
+from sqlalchemy import func, update
+from sqlalchemy.exc import IntegrityError
+from app.database import AsyncSessionLocal, ShardSessionLocal, SHARD_COUNT
+from app.models.account import Account, AccountNumberSequence
+from app.schemas.account import AccountCreate, AccountBulkCreate
+from app.services.shards import (
+    ACCOUNT_NUMBER_SEQUENCE, ACCOUNT_ID_SEQUENCE, shard_directory, place_account, for_each_shard, raise_sequence
+)
+from typing import Optional
+import asyncio
+import os
 
-def generate_account_number() -> str:
-    return ''.join(random.choices(string.digits, k=12))
+ACCOUNT_NUMBER_BLOCK_SIZE = int(os.getenv("ACCOUNT_NUMBER_BLOCK_SIZE", "1000"))
+# prefix + 11-digit sequence value + 1 Luhn check digit = 14-digit account numbers. The prefix and
+# length keep them apart from the 12-digit numbers that were once drawn at random.
+ACCOUNT_NUMBER_PREFIX = "10"
+ACCOUNT_NUMBER_LENGTH = len(ACCOUNT_NUMBER_PREFIX) + 12
+ACCOUNT_NUMBER_ATTEMPTS = 3
 
-async def create_account(db: AsyncSession, user_id: int, account_data: AccountCreate):
-    # generate unique account number
-    while True:
-        account_number = generate_account_number()
-        result = await db.execute(
-            select(Account).where(Account.account_number == account_number)
+def luhn_check_digit(body: str) -> str:
+    total = 0
+    for i, ch in enumerate(reversed(body)):
+        digit = int(ch)
+        if i % 2 == 0:
+            digit *= 2
+            if digit > 9:
+                digit -= 9
+        total += digit
+    return str((10 - total % 10) % 10)
+
+def format_account_number(sequence_value: int) -> str:
+    body = f"{ACCOUNT_NUMBER_PREFIX}{sequence_value:011d}"
+    return body + luhn_check_digit(body)
+
+def sequence_value_of(account_number: str) -> Optional[int]:
+    # inverse of format_account_number; None for numbers the sequence did not format
+    body = account_number[len(ACCOUNT_NUMBER_PREFIX):-1]
+    if (
+        len(account_number) != ACCOUNT_NUMBER_LENGTH
+        or not account_number.startswith(ACCOUNT_NUMBER_PREFIX)
+        or not body.isdigit()
+    ):
+        return None
+    return int(body)
+
+class AccountNumberAllocator:
+    """Hands out account numbers from blocks reserved atomically in account_number_sequences.
+
+    Each process reserves ACCOUNT_NUMBER_BLOCK_SIZE values with one UPDATE, then allocates
+    from memory, so numbers stay unique across workers without per-account lookups. The same
+    mechanism allocates account ids when accounts are spread over several shards.
+    """
+
+    def __init__(self, block_size: int, sequence_id: int = ACCOUNT_NUMBER_SEQUENCE, formatter=format_account_number):
+        self.block_size = block_size
+        self.sequence_id = sequence_id
+        self.formatter = formatter
+        self._next = 0
+        self._end = 0
+        self._lock = asyncio.Lock()
+
+    async def _reserve_block(self, size: int):
+        # runs on its own session so the reservation commits independently of the caller
+        while True:
+            async with AsyncSessionLocal() as session:
+                result = await session.execute(
+                    update(AccountNumberSequence)
+                    .where(AccountNumberSequence.id == self.sequence_id)
+                    .values(next_value=AccountNumberSequence.next_value + size)
+                    .returning(AccountNumberSequence.next_value)
+                )
+                end = result.scalar_one_or_none()
+                if end is None:
+                    session.add(AccountNumberSequence(id=self.sequence_id, next_value=size))
+                    end = size
+                try:
+                    await session.commit()
+                except IntegrityError:
+                    # another worker created the sequence row first; reserve again
+                    continue
+                return end - size, end
+
+    def discard_block(self):
+        # the rest of the reserved block is not handed out; the next allocation reserves anew
+        self._next = self._end = 0
+
+    async def allocate(self, count: int = 1):
+        async with self._lock:
+            numbers = []
+            while len(numbers) < count:
+                if self._next >= self._end:
+                    self._next, self._end = await self._reserve_block(max(self.block_size, count - len(numbers)))
+                take = min(count - len(numbers), self._end - self._next)
+                numbers.extend(self.formatter(value) for value in range(self._next, self._next + take))
+                self._next += take
+            return numbers
+
+account_number_allocator = AccountNumberAllocator(ACCOUNT_NUMBER_BLOCK_SIZE)
+# global account ids, only used with more than one shard (seeded by prepare_shards)
+account_id_allocator = AccountNumberAllocator(ACCOUNT_NUMBER_BLOCK_SIZE, ACCOUNT_ID_SEQUENCE, int)
+
+async def _highest_sequence_value(session: AsyncSession) -> int:
+    # highest account number in the sequence's format, imported ones included
+    result = await session.execute(
+        select(func.max(Account.account_number)).where(
+            Account.account_number.startswith(ACCOUNT_NUMBER_PREFIX),
+            func.length(Account.account_number) == ACCOUNT_NUMBER_LENGTH
         )
-        if not result.scalar_one_or_none():
-            break
+    )
+    number = result.scalar_one_or_none()
+    value = sequence_value_of(number) if number else None
+    return -1 if value is None else value
+
+async def raise_account_number_sequence():
+    # Moves the sequence past every number in its format on any shard. Runs at startup and
+    # after imports, which write account numbers the sequence did not hand out.
+    floor = max(await for_each_shard(lambda session, shard: _highest_sequence_value(session))) + 1
+    while True:
+        async with AsyncSessionLocal() as session:
+            await raise_sequence(session, ACCOUNT_NUMBER_SEQUENCE, floor)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # another worker created the sequence row first; raise it again
+                continue
+            return
+
+async def _insert_accounts(session: AsyncSession, accounts: list):
+    # A worker's reserved block can still meet numbers imported after it was reserved. The
+    # insert is retried with numbers from past them instead of failing the request.
+    for _ in range(ACCOUNT_NUMBER_ATTEMPTS):
+        session.add_all(accounts)
+        try:
+            await session.commit()
+            return
+        except IntegrityError:
+            await session.rollback()
+        account_number_allocator.discard_block()
+        await raise_account_number_sequence()
+        for account, account_number in zip(accounts, await account_number_allocator.allocate(len(accounts))):
+            account.account_number = account_number
+    raise HTTPException(status_code=503, detail="Could not allocate an account number, retry shortly")
+
+async def _add_accounts(db: AsyncSession, new_accounts: list):
+    if SHARD_COUNT == 1:
+        await _insert_accounts(db, new_accounts)
+        return new_accounts
+
+    # ids come from the global sequence so they are unique across shards; the directory row
+    # commits first, so a placed account is always routable once it exists
+    ids = await account_id_allocator.allocate(len(new_accounts))
+    by_shard = {}
+    for account_id, account in zip(ids, new_accounts):
+        account.id = account_id
+        by_shard.setdefault(place_account(account_id), []).append(account)
+    await shard_directory.assign({account.id: shard for shard, accounts in by_shard.items() for account in accounts})
+    for shard, accounts in by_shard.items():
+        async with ShardSessionLocal[shard]() as session:
+            await _insert_accounts(session, accounts)
+    return new_accounts
+
+async def create_account(db: AsyncSession, user_id: int, account_data: AccountCreate):
+    account_number, = await account_number_allocator.allocate(1)
 
     new_account = Account(
         account_number=account_number,
         account_type=account_data.account_type,
-        balance=0.00,
+        balance=Decimal("0.00"),
         owner_id=user_id
     )
-    db.add(new_account)
-    await db.commit()
-    await db.refresh(new_account)
+    new_account, = await _add_accounts(db, [new_account])
     return new_account
 
+async def create_accounts_bulk(db: AsyncSession, user_id: int, account_data: AccountBulkCreate):
+    account_numbers = await account_number_allocator.allocate(account_data.count)
+
+    new_accounts = [
+        Account(
+            account_number=account_number,
+            account_type=account_data.account_type,
+            balance=Decimal("0.00"),
+            owner_id=user_id
+        )
+        for account_number in account_numbers
+    ]
+    return await _add_accounts(db, new_accounts)
+
 async def get_user_accounts(db: AsyncSession, user_id: int):
+    # column rows rather than ORM instances; they serialize the same way
     result = await db.execute(
-        select(Account).where(Account.owner_id == user_id)
+        select(*Account.__table__.c).where(Account.owner_id == user_id)
     )
-    return result.scalars().all()
+    return result.all()
 
 async def get_account_by_id(db: AsyncSession, account_id: int):
     result = await db.execute(
         select(Account).where(Account.id == account_id)
     )
     return result.scalar_one_or_none()
+
+async def list_user_accounts(user_id: int):
+    # every shard may hold some of the user's accounts
+    per_shard = await for_each_shard(lambda session, shard: get_user_accounts(session, user_id), read=True)
+    return sorted((account for accounts in per_shard for account in accounts), key=lambda account: account.id)
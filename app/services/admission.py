@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from fastapi import HTTPException
+import asyncio
+import math
+import os
+import time
+
+# rate limits are "<tokens per second>/<burst>"; a rate of 0 turns limiting off
+RATE_LIMIT_DEFAULT = os.getenv("RATE_LIMIT_DEFAULT", "0/0")
+# per-route overrides, e.g. "transfer=5/10,batch=1/2"
+RATE_LIMIT_ROUTES = os.getenv("RATE_LIMIT_ROUTES", "")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+WRITE_CONCURRENCY_LIMIT = int(os.getenv("WRITE_CONCURRENCY_LIMIT", "32"))
+WRITE_QUEUE_LIMIT = int(os.getenv("WRITE_QUEUE_LIMIT", "256"))
+WRITE_QUEUE_TIMEOUT_MS = float(os.getenv("WRITE_QUEUE_TIMEOUT_MS", "5000"))
+
+def _parse_limit(value: str):
+    rate, _, burst = value.partition("/")
+    rate = float(rate)
+    return rate, float(burst) if burst else max(rate, 1.0)
+
+def _parse_routes(value: str) -> dict:
+    limits = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, limit = item.partition("=")
+        limits[route.strip()] = _parse_limit(limit)
+    return limits
+
+class RateLimiter:
+    """Token bucket per (user, route), refilled lazily on each check and kept in a bounded LRU.
+
+    An evicted bucket comes back full, which only matters for users idle long enough to refill anyway.
+    """
+
+    def __init__(self, default: tuple, routes: dict, maxsize: int):
+        self.default = default
+        self.routes = routes
+        self.maxsize = maxsize
+        self.rejected = {}
+        self._buckets = OrderedDict()
+
+    def limit_for(self, route: str) -> tuple:
+        return self.routes.get(route, self.default)
+
+    def check(self, user_id: int, route: str) -> float:
+        # 0 when a token was taken, otherwise the seconds until one is available
+        rate, burst = self.limit_for(route)
+        if rate <= 0:
+            return 0
+        now = time.monotonic()
+        key = (user_id, route)
+        tokens, updated = self._buckets.get(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.rejected[route] = self.rejected.get(route, 0) + 1
+            return (1 - tokens) / rate
+        self._buckets[key] = (tokens - 1, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return 0
+
+class WriteLimiter:
+    """Caps in-flight money-movement requests process-wide.
+
+    Requests past the cap wait in line; once WRITE_QUEUE_LIMIT are waiting, or a wait passes
+    WRITE_QUEUE_TIMEOUT_MS, new ones are shed with 503 instead of piling up on the SQLite writer.
+    """
+
+    def __init__(self, limit: int, queue_limit: int, timeout_ms: float):
+        self.limit = limit
+        self.queue_limit = queue_limit
+        self.timeout = timeout_ms / 1000
+        self.in_flight = 0
+        self.waiting = 0
+        self.shed = 0
+        self._semaphore = asyncio.Semaphore(limit) if limit > 0 else None
+
+    def _overloaded(self):
+        self.shed += 1
+        return HTTPException(
+            status_code=503,
+            detail="Too many transactions in flight, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    async def acquire(self):
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_limit:
+                raise self._overloaded()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                raise self._overloaded()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+
+    def release(self):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            yield
+            return
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+rate_limiter = RateLimiter(_parse_limit(RATE_LIMIT_DEFAULT), _parse_routes(RATE_LIMIT_ROUTES), RATE_LIMIT_MAX_KEYS)
+write_limiter = WriteLimiter(WRITE_CONCURRENCY_LIMIT, WRITE_QUEUE_LIMIT, WRITE_QUEUE_TIMEOUT_MS)
+
+def rate_limited(user_id: int, route: str):
+    retry_after = rate_limiter.check(user_id, route)
+    if retry_after:
+        raise HTTPException(
+            status_code=429,
+            detail=f"Rate limit exceeded for {route}",
+            headers={"Retry-After": str(math.ceil(retry_after))}
+        )
@@ -0,0 +1,114 @@
+from datetime import date
+from decimal import Decimal
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.rollup import AccountDailyRollup
+from app.models.transaction import TransactionStatus
+from app.services.account import list_user_accounts
+from app.services.shards import for_each_shard
+from app.services.transaction import get_owned_account
+from typing import List, Optional
+
+def _in_period(query, from_date: Optional[date], to_date: Optional[date]):
+    if from_date:
+        query = query.where(AccountDailyRollup.day >= from_date)
+    if to_date:
+        query = query.where(AccountDailyRollup.day <= to_date)
+    return query
+
+async def _rollup_rows(db: AsyncSession, account_ids: List[int], from_date: Optional[date], to_date: Optional[date]):
+    # reads only the rollup table: O(accounts x days) regardless of ledger size
+    if not account_ids:
+        return [], []
+    result = await db.execute(_in_period(
+        select(
+            AccountDailyRollup.transaction_type,
+            AccountDailyRollup.status,
+            func.sum(AccountDailyRollup.txn_count).label("txn_count"),
+            func.sum(AccountDailyRollup.amount_total).label("amount_total"),
+        )
+        .where(AccountDailyRollup.account_id.in_(account_ids))
+        .group_by(AccountDailyRollup.transaction_type, AccountDailyRollup.status),
+        from_date, to_date
+    ))
+    type_rows = result.all()
+
+    result = await db.execute(_in_period(
+        select(
+            AccountDailyRollup.day,
+            func.sum(AccountDailyRollup.inflow).label("inflow"),
+            func.sum(AccountDailyRollup.outflow).label("outflow"),
+        )
+        .where(AccountDailyRollup.account_id.in_(account_ids))
+        .group_by(AccountDailyRollup.day)
+        .order_by(AccountDailyRollup.day),
+        from_date, to_date
+    ))
+    return type_rows, result.all()
+
+def _summarize(type_rows, daily_rows, from_date: Optional[date], to_date: Optional[date]):
+    totals_by_type = {}
+    counts_by_type = {}
+    counts_by_status = {}
+    for row in type_rows:
+        type_key = row.transaction_type.value
+        counts_by_status[row.status.value] = counts_by_status.get(row.status.value, 0) + row.txn_count
+        if row.status == TransactionStatus.completed:
+            totals_by_type[type_key] = totals_by_type.get(type_key, Decimal("0")) + Decimal(str(row.amount_total))
+            counts_by_type[type_key] = counts_by_type.get(type_key, 0) + row.txn_count
+
+    # daily rows may come from several shards; merge them per day
+    flows = {}
+    for row in daily_rows:
+        day_in, day_out = flows.get(row.day, (Decimal("0"), Decimal("0")))
+        flows[row.day] = (day_in + Decimal(str(row.inflow)), day_out + Decimal(str(row.outflow)))
+    inflow = outflow = Decimal("0.00")
+    daily = []
+    for day in sorted(flows):
+        day_in = flows[day][0].quantize(Decimal("0.01"))
+        day_out = flows[day][1].quantize(Decimal("0.01"))
+        inflow += day_in
+        outflow += day_out
+        daily.append({"day": day, "inflow": day_in, "outflow": day_out})
+
+    return {
+        "period_start": from_date,
+        "period_end": to_date,
+        "totals_by_type": {key: value.quantize(Decimal("0.01")) for key, value in totals_by_type.items()},
+        "counts_by_type": counts_by_type,
+        "counts_by_status": counts_by_status,
+        "inflow": inflow,
+        "outflow": outflow,
+        "daily": daily,
+    }
+
+async def get_account_summary(
+    db: AsyncSession,
+    account_id: int,
+    user_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+):
+    await get_owned_account(db, account_id, user_id)
+    summary = _summarize(*await _rollup_rows(db, [account_id], from_date, to_date), from_date, to_date)
+    summary["account_id"] = account_id
+    return summary
+
+async def get_user_summary(
+    user_id: int,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None
+):
+    # a shard only holds rollups for its own accounts, so each one can be asked about all of them
+    account_ids = [account.id for account in await list_user_accounts(user_id)]
+    per_shard = await for_each_shard(
+        lambda session, shard: _rollup_rows(session, account_ids, from_date, to_date), read=True
+    )
+    summary = _summarize(
+        [row for type_rows, _ in per_shard for row in type_rows],
+        [row for _, daily_rows in per_shard for row in daily_rows],
+        from_date, to_date
+    )
+    summary["account_ids"] = account_ids
+    return summary
@@ -0,0 +1,128 @@
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.database import ShardSessionLocal
+from app.models.transaction import Transaction, ArchivedTransaction, TransactionStatus, LEDGER_TIERS
+from typing import Optional
+import asyncio
+import logging
+import os
+
+# 0 keeps every row in the hot table
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "0"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+
+ARCHIVED_COLUMNS = (
+    "id", "amount", "transaction_type", "status", "direction", "description", "account_id", "created_at"
+)
+
+# statuses a ledger row never leaves
+SETTLED_STATUSES = (TransactionStatus.completed, TransactionStatus.failed)
+
+logger = logging.getLogger(__name__)
+
+def ledger_tiers(newest_first: bool = False):
+    return tuple(reversed(LEDGER_TIERS)) if newest_first else LEDGER_TIERS
+
+def keyset_filter(tier, created_at: Optional[datetime], txn_id: int, newer: bool):
+    # rows strictly after (created_at, id) in history order, which the index can seek on
+    if created_at is None:
+        # cursors issued before they carried created_at
+        return tier.id > txn_id if newer else tier.id < txn_id
+    # bound through the column type so the value is rendered the way the rows are stored
+    key = tuple_(tier.created_at, tier.id)
+    cursor = tuple_(literal(created_at, tier.created_at.type), literal(txn_id, tier.id.type))
+    return key > cursor if newer else key < cursor
+
+async def read_tiers(db: AsyncSession, build, limit: int, newest_first: bool = True):
+    # build(tier) -> select over one tier ordered by (created_at, id). An account's archived rows
+    # are all older than its hot ones, so reading the tiers one after another keeps the order,
+    # and the colder tier is only queried when the warmer one cannot fill the page.
+    rows = []
+    for tier in ledger_tiers(newest_first):
+        query = build(tier)
+        if rows:
+            # a batch archived between the two reads must not show up twice
+            query = query.where(keyset_filter(tier, rows[-1].created_at, rows[-1].id, newer=not newest_first))
+        result = await db.execute(query.limit(limit - len(rows)))
+        rows.extend(result.all())
+        if len(rows) >= limit:
+            break
+    return rows
+
+async def archive_transactions(db: AsyncSession, older_than: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    # Moves the oldest settled (completed or failed) rows to the archive, one short transaction
+    # per batch. Only a prefix of the hot table (by id) is ever moved, stopping at the first row
+    # that is not archivable yet, so every archived id stays below every hot id. Failed rows never
+    # change again, so they must not hold the prefix back. The newest row always stays hot so
+    # SQLite keeps allocating ids above the archive.
+    hot = Transaction.__table__
+    moved = 0
+    while True:
+        newest_id = (await db.execute(select(func.max(Transaction.id)))).scalar()
+        if newest_id is None:
+            break
+        result = await db.execute(
+            select(Transaction.id, Transaction.status, Transaction.created_at)
+            .where(Transaction.id < newest_id)
+            .order_by(Transaction.id)
+            .limit(batch_size)
+        )
+        ids = []
+        for row in result.all():
+            if row.status not in SETTLED_STATUSES or row.created_at is None or row.created_at >= older_than:
+                break
+            ids.append(row.id)
+        if not ids:
+            break
+
+        # exactly the rows checked above: a row committed inside the id range since then is not
+        # known to be archivable and must not be deleted
+        in_batch = hot.c.id.in_(ids)
+        await db.execute(
+            insert(ArchivedTransaction).from_select(
+                ARCHIVED_COLUMNS,
+                select(*(hot.c[name] for name in ARCHIVED_COLUMNS)).where(in_batch)
+            )
+        )
+        await db.execute(delete(hot).where(in_batch))
+        await db.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+        # let queued writers in between batches
+        await asyncio.sleep(0)
+    return moved
+
+async def run_archiver():
+    while True:
+        for shard, session_factory in enumerate(ShardSessionLocal):
+            try:
+                async with session_factory() as session:
+                    moved = await archive_transactions(session, datetime.utcnow() - timedelta(days=ARCHIVE_AFTER_DAYS))
+                if moved:
+                    logger.info("Archived %d ledger rows on shard %d", moved, shard)
+            except Exception:
+                logger.exception("Ledger archive pass failed on shard %d", shard)
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+_archive_task = None
+
+def start_archiver():
+    global _archive_task
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return
+    _archive_task = asyncio.create_task(run_archiver())
+
+async def stop_archiver():
+    global _archive_task
+    if not _archive_task:
+        return
+    _archive_task.cancel()
+    try:
+        await _archive_task
+    except asyncio.CancelledError:
+        pass
+    _archive_task = None
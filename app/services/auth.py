@@ -1,7 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from fastapi import HTTPException
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from app.schemas.user import TokenData
+from functools import lru_cache
+import asyncio
 import os
 from dotenv import load_dotenv
 
@@ -11,8 +15,19 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES"))
 
-# password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "64"))
+
+# password hashing; min/max rounds pinned to the configured cost so hashes made
+# with any other cost are flagged for a rehash on the next successful login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -20,6 +35,47 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# bcrypt releases the GIL, so a small thread pool keeps it off the event loop
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending_hash_jobs = 0
+
+async def _run_in_hash_pool(fn, *args):
+    global _pending_hash_jobs
+    if _pending_hash_jobs >= PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Too many concurrent password operations, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    _pending_hash_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _pending_hash_jobs -= 1
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    return pwd_context.hash("dummy-password-for-timing")
+
+def _verify_dummy(plain_password: str) -> bool:
+    # runs in the pool: the first call also pays for hashing the dummy password there
+    return pwd_context.verify(plain_password, _dummy_hash())
+
+async def hash_password_async(password: str) -> str:
+    return await _run_in_hash_pool(hash_password, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str):
+    # returns (valid, new_hash); new_hash is set when the stored hash uses a stale cost
+    return await _run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def verify_dummy_password(plain_password: str) -> bool:
+    # burns one full bcrypt round for unknown emails so login timing does not leak which emails exist
+    await _run_in_hash_pool(_verify_dummy, plain_password)
+    return False
+
+def shutdown_hash_pool():
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -32,6 +88,6 @@ def verify_token(token: str) -> TokenData:
         email: str = payload.get("sub")
         if email is None:
             return None
-        return TokenData(email=email)
+        return TokenData(email=email, exp=payload.get("exp"))
     except JWTError:
         return None
@@ -0,0 +1,124 @@
+from sqlalchemy import event
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from app.database import ReadSessionLocal
+from app.schemas.transaction import TransactionResponse
+from app.services.archive import ledger_tiers
+from typing import Iterable, Optional
+import asyncio
+import os
+
+SSE_BUFFER_SIZE = int(os.getenv("SSE_BUFFER_SIZE", "256"))
+SSE_KEEPALIVE_SECONDS = float(os.getenv("SSE_KEEPALIVE_SECONDS", "15"))
+SSE_REPLAY_PAGE = 500
+
+class Subscriber:
+    def __init__(self, account_ids: Iterable[int], buffer_size: int):
+        self.account_ids = set(account_ids)
+        self.queue = asyncio.Queue(maxsize=buffer_size)
+        self.overflowed = False
+
+class TransactionHub:
+    """In-process pub/sub of committed ledger rows, fanned out per account."""
+
+    def __init__(self, buffer_size: int):
+        self.buffer_size = buffer_size
+        self.dropped_subscribers = 0
+        self._subscribers = {}
+
+    def subscribe(self, account_ids: Iterable[int]) -> Subscriber:
+        subscriber = Subscriber(account_ids, self.buffer_size)
+        for account_id in subscriber.account_ids:
+            self._subscribers.setdefault(account_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        for account_id in subscriber.account_ids:
+            subscribers = self._subscribers.get(account_id)
+            if subscribers:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[account_id]
+
+    def publish(self, rows):
+        for row in rows:
+            subscribers = self._subscribers.get(row.account_id)
+            if not subscribers:
+                continue
+            payload = (row.account_id, row.id, TransactionResponse.model_validate(row).model_dump_json())
+            for subscriber in list(subscribers):
+                try:
+                    subscriber.queue.put_nowait(payload)
+                except asyncio.QueueFull:
+                    # a slow consumer is cut off instead of growing memory; it resumes via Last-Event-ID
+                    subscriber.overflowed = True
+                    self.unsubscribe(subscriber)
+                    self.dropped_subscribers += 1
+
+    @property
+    def subscriber_count(self) -> int:
+        return len({id(s) for subscribers in self._subscribers.values() for s in subscribers})
+
+transaction_hub = TransactionHub(SSE_BUFFER_SIZE)
+
+def queue_for_publish(db, rows):
+    # rows are published only once the session's transaction actually commits
+    db.info.setdefault("pending_events", []).extend(rows)
+
+@event.listens_for(Session, "after_commit")
+def _publish_committed(session):
+    rows = session.info.pop("pending_events", None)
+    if rows:
+        transaction_hub.publish(rows)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("pending_events", None)
+
+def _sse(event_id: int, data: str) -> str:
+    return f"id: {event_id}\nevent: transaction\ndata: {data}\n\n"
+
+async def _replay(session_factory, account_ids, last_event_id: int):
+    # catch-up from the ledger, in pages, for everything after the client's last seen id
+    async with session_factory() as session:
+        for tier in ledger_tiers():
+            while True:
+                result = await session.execute(
+                    select(tier)
+                    .where(tier.account_id.in_(account_ids), tier.id > last_event_id)
+                    .order_by(tier.id)
+                    .limit(SSE_REPLAY_PAGE)
+                )
+                rows = result.scalars().all()
+                for row in rows:
+                    yield row.account_id, row.id, TransactionResponse.model_validate(row).model_dump_json()
+                if rows:
+                    last_event_id = rows[-1].id
+                if len(rows) < SSE_REPLAY_PAGE:
+                    break
+
+async def stream_events(request, account_ids, last_event_id: Optional[int] = None, session_factory=ReadSessionLocal):
+    # Subscribe before replaying so nothing committed in between is missed. Duplicates are
+    # skipped per account: ids only grow within an account, not across shards.
+    subscriber = transaction_hub.subscribe(account_ids)
+    try:
+        sent_up_to = dict.fromkeys(account_ids, last_event_id or 0)
+        if last_event_id is not None:
+            async for account_id, event_id, data in _replay(session_factory, list(account_ids), last_event_id):
+                sent_up_to[account_id] = event_id
+                yield _sse(event_id, data)
+
+        while not subscriber.overflowed:
+            try:
+                account_id, event_id, data = await asyncio.wait_for(subscriber.queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": keepalive\n\n"
+                continue
+            if event_id <= sent_up_to[account_id]:
+                continue
+            sent_up_to[account_id] = event_id
+            yield _sse(event_id, data)
+    finally:
+        transaction_hub.unsubscribe(subscriber)
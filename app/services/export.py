@@ -0,0 +1,105 @@
+from datetime import datetime
+from decimal import Decimal
+from enum import Enum
+from sqlalchemy import literal_column, union_all
+from sqlalchemy.future import select
+from app.database import ShardReadSessionLocal
+from app.models.account import Account
+from app.schemas.transaction import ExportFormat
+from app.services.archive import ledger_tiers
+from typing import Optional
+import csv
+import io
+import json
+import zlib
+
+EXPORT_CHUNK_ROWS = 1000
+EXPORT_COLUMNS = (
+    "id", "account_id", "account_number", "transaction_type", "status", "direction",
+    "amount", "description", "created_at",
+)
+
+def export_query(user_id: int, from_date: Optional[datetime] = None, to_date: Optional[datetime] = None):
+    # plain column tuples: no ORM instances are built for exported rows
+    def tier_query(tier):
+        query = (
+            select(
+                tier.id.label("id"),
+                tier.account_id.label("account_id"),
+                Account.account_number,
+                tier.transaction_type,
+                tier.status,
+                tier.direction,
+                tier.amount,
+                tier.description,
+                tier.created_at,
+            )
+            .join(Account, Account.id == tier.account_id)
+            .where(Account.owner_id == user_id)
+        )
+        if from_date:
+            query = query.where(tier.created_at >= from_date)
+        if to_date:
+            query = query.where(tier.created_at <= to_date)
+        return query
+
+    # archived and hot rows in one ordered stream
+    return union_all(*(tier_query(tier) for tier in ledger_tiers())).order_by(
+        literal_column("account_id"), literal_column("id")
+    )
+
+def _plain(value):
+    # JSON/CSV-safe value; money stays an exact decimal string
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+def _csv_chunk(rows, header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        writer.writerow(["" if value is None else _plain(value) for value in row])
+    return buffer.getvalue()
+
+def _ndjson_chunk(rows) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, (_plain(value) for value in row)))) + "\n"
+        for row in rows
+    )
+
+async def _export_chunks(query, export_format: ExportFormat):
+    if export_format == ExportFormat.csv:
+        yield _csv_chunk([], header=True)
+    # shard by shard: rows are ordered by account within each shard
+    for session_factory in ShardReadSessionLocal:
+        async with session_factory() as session:
+            result = await session.stream(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+            async for rows in result.partitions(EXPORT_CHUNK_ROWS):
+                yield _csv_chunk(rows) if export_format == ExportFormat.csv else _ndjson_chunk(rows)
+
+async def stream_export(
+    user_id: int,
+    export_format: ExportFormat,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    gzip: bool = False
+):
+    # one server-side cursor, one formatted chunk per partition: memory stays flat at any ledger size
+    chunks = _export_chunks(export_query(user_id, from_date, to_date), export_format)
+    if not gzip:
+        async for chunk in chunks:
+            yield chunk.encode()
+        return
+
+    compressor = zlib.compressobj(wbits=31)  # 31 = gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,135 @@
+from dataclasses import dataclass
+from fastapi import HTTPException
+from app.database import ShardSessionLocal
+from app.services.metrics import Histogram
+from app.services.shards import shard_directory
+import asyncio
+import os
+import time
+
+GROUP_COMMIT_ENABLED = os.getenv("GROUP_COMMIT_ENABLED", "false").lower() == "true"
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "5"))
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", "256"))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+FLUSH_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+@dataclass
+class _Job:
+    apply: object
+    data: object
+    user_id: int
+    future: asyncio.Future
+
+class GroupCommitter:
+    """Write-combining queue: money-movement jobs that arrive within one window share a single commit."""
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.flush_latency = Histogram(FLUSH_LATENCY_BUCKETS)
+        self.failed_flushes = 0
+        self._queue = None
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            if not job.future.done():
+                job.future.set_exception(HTTPException(status_code=503, detail="Service shutting down"))
+
+    async def submit(self, apply, data, user_id: int):
+        # apply(db, data, user_id) must do its writes without committing
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(_Job(apply, data, user_id, future))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_batch:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        # one shared commit per shard; with a single shard that is the whole batch
+        by_shard = {}
+        try:
+            for job in batch:
+                by_shard.setdefault(await shard_directory.shard_for(job.data.account_id), []).append(job)
+        except Exception as exc:
+            self.failed_flushes += 1
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(exc)
+            return
+        for shard, jobs in by_shard.items():
+            await self._flush_shard(jobs, ShardSessionLocal[shard])
+
+    async def _flush_shard(self, batch, session_factory):
+        started = time.perf_counter()
+        # stable sort: accounts are touched in ascending id order, each account's jobs stay FIFO
+        ordered = sorted(batch, key=lambda job: job.data.account_id)
+        outcomes = []
+        try:
+            async with session_factory() as session:
+                for job in ordered:
+                    if job.future.cancelled():
+                        continue
+                    try:
+                        outcomes.append((job, await job.apply(session, job.data, job.user_id), None))
+                    except HTTPException as exc:
+                        # rejected jobs change nothing (their conditional UPDATE matched no row)
+                        outcomes.append((job, None, exc))
+                await session.commit()
+        except Exception as exc:
+            self.failed_flushes += 1
+            for job in batch:
+                if not job.future.done():
+                    job.future.set_exception(exc)
+            return
+
+        self.batch_sizes.observe(len(batch))
+        self.flush_latency.observe(time.perf_counter() - started)
+        # callers only see their row once the shared commit is durable
+        for job, result, exc in outcomes:
+            if job.future.done():
+                continue
+            if exc:
+                job.future.set_exception(exc)
+            else:
+                job.future.set_result(result)
+
+group_committer = GroupCommitter(GROUP_COMMIT_WINDOW_MS, GROUP_COMMIT_MAX_BATCH)
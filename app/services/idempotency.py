@@ -0,0 +1,160 @@
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from fastapi import HTTPException
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.database import ShardSessionLocal
+from app.models.idempotency import IdempotencyKey
+from app.schemas.transaction import TransactionResponse
+import asyncio
+import hashlib
+import logging
+import os
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_SWEEP_INTERVAL_SECONDS = int(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL_SECONDS", "300"))
+IDEMPOTENCY_SWEEP_BATCH = 1000
+
+logger = logging.getLogger(__name__)
+
+class ReplayCache:
+    """LRU of (user_id, key) -> stored response, in front of the idempotency_keys table."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def get(self, user_id: int, key: str):
+        entry = self._entries.get((user_id, key))
+        if entry is None or entry[0] <= datetime.utcnow():
+            self.misses += 1
+            return None
+        self._entries.move_to_end((user_id, key))
+        self.hits += 1
+        return entry
+
+    def put(self, user_id: int, key: str, expires_at: datetime, endpoint: str, request_hash: str, response):
+        if self.maxsize <= 0:
+            return
+        self._entries[(user_id, key)] = (expires_at, endpoint, request_hash, response)
+        self._entries.move_to_end((user_id, key))
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def prune(self):
+        now = datetime.utcnow()
+        for cache_key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[cache_key]
+
+replay_cache = ReplayCache(IDEMPOTENCY_CACHE_SIZE)
+
+def request_fingerprint(endpoint: str, data) -> str:
+    return hashlib.sha256(f"{endpoint}:{data.model_dump_json()}".encode()).hexdigest()
+
+def _check_replay(endpoint: str, request_hash: str, stored_endpoint: str, stored_hash: str):
+    if stored_endpoint != endpoint or stored_hash != request_hash:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+
+async def _load_replay(db: AsyncSession, user_id: int, key: str):
+    result = await db.execute(
+        select(IdempotencyKey.expires_at, IdempotencyKey.endpoint, IdempotencyKey.request_hash, IdempotencyKey.response)
+        .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+    )
+    row = result.first()
+    if not row or row.expires_at <= datetime.utcnow():
+        return None
+    response = TransactionResponse.model_validate_json(row.response)
+    replay_cache.put(user_id, key, row.expires_at, row.endpoint, row.request_hash, response)
+    return row.endpoint, row.request_hash, response
+
+async def run_idempotent(db: AsyncSession, user_id: int, key: str, endpoint: str, data, apply):
+    request_hash = request_fingerprint(endpoint, data)
+
+    # 1. Replays are answered from memory or the key table, never touching account rows
+    cached = replay_cache.get(user_id, key)
+    if cached:
+        _, stored_endpoint, stored_hash, response = cached
+        _check_replay(endpoint, request_hash, stored_endpoint, stored_hash)
+        return response
+    stored = await _load_replay(db, user_id, key)
+    if stored:
+        _check_replay(endpoint, request_hash, *stored[:2])
+        return stored[2]
+
+    # 2. First time: move the money and record the key in the same commit
+    txn = await apply(db, data, user_id)
+    response = TransactionResponse.model_validate(txn)
+    expires_at = datetime.utcnow() + timedelta(seconds=IDEMPOTENCY_TTL_SECONDS)
+    try:
+        # an expired row for the same key may still be waiting for the sweeper
+        await db.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .where(IdempotencyKey.expires_at <= datetime.utcnow())
+        )
+        await db.execute(insert(IdempotencyKey).values(
+            key=key,
+            user_id=user_id,
+            endpoint=endpoint,
+            request_hash=request_hash,
+            response=response.model_dump_json(),
+            expires_at=expires_at
+        ))
+        await db.commit()
+    except IntegrityError:
+        # a concurrent retry with the same key won the race; discard our writes and replay theirs
+        await db.rollback()
+        stored = await _load_replay(db, user_id, key)
+        if not stored:
+            raise HTTPException(status_code=409, detail="Request with this Idempotency-Key is in progress")
+        _check_replay(endpoint, request_hash, *stored[:2])
+        return stored[2]
+
+    replay_cache.put(user_id, key, expires_at, endpoint, request_hash, response)
+    return response
+
+async def sweep_expired_keys():
+    # deletes in small batches so the writer lock is never held for long
+    # keys live on the shard of the account they moved money on
+    deleted = 0
+    for session_factory in ShardSessionLocal:
+        while True:
+            async with session_factory() as session:
+                expired = select(IdempotencyKey.id).where(IdempotencyKey.expires_at <= datetime.utcnow()).limit(IDEMPOTENCY_SWEEP_BATCH)
+                result = await session.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired)))
+                await session.commit()
+            deleted += result.rowcount
+            if result.rowcount < IDEMPOTENCY_SWEEP_BATCH:
+                break
+    replay_cache.prune()
+    return deleted
+
+async def run_sweeper():
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_SWEEP_INTERVAL_SECONDS)
+        try:
+            await sweep_expired_keys()
+        except Exception:
+            logger.exception("Idempotency key sweep failed")
+
+_sweeper_task = None
+
+def start_sweeper():
+    global _sweeper_task
+    _sweeper_task = asyncio.create_task(run_sweeper())
+
+async def stop_sweeper():
+    global _sweeper_task
+    if not _sweeper_task:
+        return
+    _sweeper_task.cancel()
+    try:
+        await _sweeper_task
+    except asyncio.CancelledError:
+        pass
+    _sweeper_task = None
@@ -0,0 +1,185 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from pydantic import Field, TypeAdapter, ValidationError
+from sqlalchemy import func, insert, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.account import Account
+from app.models.import_checkpoint import ImportCheckpoint
+from app.models.transaction import Transaction, TransactionStatus, infer_direction, signed_amount
+from app.models.user import User
+from app.schemas.ledger_import import ImportUser, ImportAccount, ImportTransaction
+from app.services.account import raise_account_number_sequence
+from app.services.archive import ledger_tiers
+from typing import Annotated, Optional, Union
+import csv
+import json
+import logging
+import time
+
+IMPORT_CHUNK_SIZE = 5000
+
+logger = logging.getLogger(__name__)
+
+record_adapter = TypeAdapter(
+    Annotated[Union[ImportUser, ImportAccount, ImportTransaction], Field(discriminator="type")]
+)
+
+TABLES = {
+    "user": User.__table__,
+    "account": Account.__table__,
+    "transaction": Transaction.__table__,
+}
+
+# parents first so foreign keys always resolve within a chunk
+INSERT_ORDER = ("user", "account", "transaction")
+
+class LedgerImportError(Exception):
+    pass
+
+def read_records(path: str, file_format: str):
+    # yields (line_number, raw dict) without loading the file into memory
+    with open(path, newline="", encoding="utf-8") as handle:
+        if file_format == "csv":
+            for line_number, row in enumerate(csv.DictReader(handle), start=2):
+                yield line_number, {key: value for key, value in row.items() if value not in ("", None)}
+        else:
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as exc:
+                    raise LedgerImportError(f"line {line_number}: invalid JSON ({exc.msg})")
+
+def _naive_utc(value: datetime) -> datetime:
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _check_order(line_number: int, record, last_rows: dict):
+    # History paging, balance_as_of and snapshots walk an account's rows by id, so its ids must
+    # increase with created_at. The file lists each account's transactions in id order.
+    created_at = _naive_utc(record.created_at)
+    last = last_rows.get(record.account_id)
+    if last and (record.id <= last[0] or created_at < last[1]):
+        raise LedgerImportError(
+            f"line {line_number}: transaction {record.id} is out of order for account {record.account_id} "
+            f"(after transaction {last[0]} at {last[1].isoformat()})"
+        )
+    last_rows[record.account_id] = (record.id, created_at)
+
+async def last_ledger_rows(db: AsyncSession) -> dict:
+    # account id -> (id, created_at) of its newest ledger row already in the database
+    last_rows = {}
+    for tier in ledger_tiers():
+        newest = select(tier.account_id, func.max(tier.id).label("id")).group_by(tier.account_id).subquery()
+        result = await db.execute(
+            select(tier.account_id, tier.id, tier.created_at).join(newest, tier.id == newest.c.id)
+        )
+        for row in result.all():
+            if row.created_at is not None and row.id > last_rows.get(row.account_id, (0,))[0]:
+                last_rows[row.account_id] = (row.id, row.created_at)
+    return last_rows
+
+def validate_chunk(chunk, last_rows: dict):
+    grouped = {kind: [] for kind in INSERT_ORDER}
+    for line_number, raw in chunk:
+        try:
+            record = record_adapter.validate_python(raw)
+        except ValidationError as exc:
+            raise LedgerImportError(f"line {line_number}: {exc.errors()[0]['loc']} {exc.errors()[0]['msg']}")
+        values = record.model_dump(exclude={"type"})
+        if record.type == "account":
+            values["balance"] = Decimal("0")
+        if record.type == "transaction":
+            _check_order(line_number, record, last_rows)
+            if values["direction"] is None:
+                values["direction"] = infer_direction(record.transaction_type, record.description)
+        grouped[record.type].append(values)
+    return grouped
+
+async def _load_checkpoint(db: AsyncSession, source: str) -> int:
+    result = await db.execute(select(ImportCheckpoint.records_done).where(ImportCheckpoint.source == source))
+    return result.scalar_one_or_none() or 0
+
+async def _save_checkpoint(db: AsyncSession, source: str, records_done: int):
+    result = await db.execute(
+        update(ImportCheckpoint).where(ImportCheckpoint.source == source).values(records_done=records_done)
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(ImportCheckpoint).values(source=source, records_done=records_done))
+
+async def recompute_balances(db: AsyncSession) -> int:
+    # one set-based pass: every balance becomes the net of its completed ledger rows in both tiers
+    net = sum(
+        select(func.coalesce(func.sum(signed_amount(tier)), 0))
+        .where(tier.account_id == Account.id, tier.status == TransactionStatus.completed)
+        .scalar_subquery()
+        for tier in ledger_tiers()
+    )
+    result = await db.execute(update(Account).values(balance=func.round(net, 2)))
+    await db.commit()
+    return result.rowcount
+
+async def _reset_sequences(db: AsyncSession):
+    # explicit ids bypass PostgreSQL sequences; move them past the imported ids
+    if db.bind.dialect.name != "postgresql":
+        return
+    for table in ("users", "accounts", "transactions"):
+        await db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+        ))
+    await db.commit()
+
+def _report(records: int, started: float, final: bool = False):
+    elapsed = time.perf_counter() - started
+    rate = records / elapsed if elapsed else 0.0
+    label = "done" if final else "progress"
+    logger.info("[%s] %d records in %.1fs (%s records/s)", label, records, elapsed, f"{rate:,.0f}")
+
+async def import_ledger(
+    db: AsyncSession,
+    path: str,
+    file_format: str,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+    source: Optional[str] = None
+):
+    source = source or path
+    skip = await _load_checkpoint(db, source)
+    if skip:
+        logger.info("Resuming %s after %d records", source, skip)
+
+    last_rows = await last_ledger_rows(db)
+    started = time.perf_counter()
+    imported = 0
+    position = 0
+    chunk = []
+
+    async def flush():
+        nonlocal imported
+        grouped = validate_chunk(chunk, last_rows)
+        # Core executemany per table; the checkpoint commits atomically with the chunk
+        for kind in INSERT_ORDER:
+            if grouped[kind]:
+                await db.execute(insert(TABLES[kind]), grouped[kind])
+        await _save_checkpoint(db, source, position)
+        await db.commit()
+        imported += len(chunk)
+        chunk.clear()
+        _report(imported, started)
+
+    for line_number, raw in read_records(path, file_format):
+        position += 1
+        if position <= skip:
+            continue
+        chunk.append((line_number, raw))
+        if len(chunk) >= chunk_size:
+            await flush()
+    if chunk:
+        await flush()
+
+    await _reset_sequences(db)
+    await raise_account_number_sequence()
+    _report(imported, started, final=True)
+    return imported
@@ -0,0 +1,206 @@
+from bisect import bisect_left
+from collections import deque
+from contextvars import ContextVar
+from sqlalchemy import event
+from typing import Optional, Sequence
+import logging
+import os
+import time
+
+SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "0"))
+SLOW_REQUEST_SAMPLES = int(os.getenv("SLOW_REQUEST_SAMPLES", "50"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+
+logger = logging.getLogger(__name__)
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style (each bucket counts values <= its bound)."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "buckets": buckets}
+
+def _labels(labels: dict, **extra) -> str:
+    merged = dict(labels, **extra)
+    if not merged:
+        return ""
+    body = ",".join(f'{key}="{str(value)}"' for key, value in merged.items())
+    return "{" + body + "}"
+
+def render_histogram(lines: list, name: str, histogram: Histogram, labels: Optional[dict] = None):
+    labels = labels or {}
+    for bound, cumulative in histogram.snapshot()["buckets"].items():
+        lines.append(f"{name}_bucket{_labels(labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+class RequestStats:
+    __slots__ = ("queries", "query_time", "statements")
+
+    def __init__(self, capture_sql: bool):
+        self.queries = 0
+        self.query_time = 0.0
+        self.statements = [] if capture_sql else None
+
+# per-request DB counters; SQLAlchemy's greenlet bridge carries the context into cursor events
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+class MetricsRegistry:
+    def __init__(self):
+        self.requests_total = {}
+        self.request_latency = {}
+        self.request_queries = {}
+        self.request_query_time = {}
+        self.commit_latency = Histogram(LATENCY_BUCKETS)
+        self.pool_checkout_wait = Histogram(LATENCY_BUCKETS)
+        self.slow_requests = deque(maxlen=SLOW_REQUEST_SAMPLES)
+
+    def observe_request(self, method: str, route: str, status: int, duration: float, stats: RequestStats):
+        key = (method, route)
+        status_key = (method, route, status)
+        self.requests_total[status_key] = self.requests_total.get(status_key, 0) + 1
+        if key not in self.request_latency:
+            self.request_latency[key] = Histogram(LATENCY_BUCKETS)
+            self.request_queries[key] = Histogram(QUERY_COUNT_BUCKETS)
+            self.request_query_time[key] = Histogram(LATENCY_BUCKETS)
+        self.request_latency[key].observe(duration)
+        self.request_queries[key].observe(stats.queries)
+        self.request_query_time[key].observe(stats.query_time)
+
+        if SLOW_REQUEST_THRESHOLD_MS and duration * 1000 >= SLOW_REQUEST_THRESHOLD_MS:
+            sample = {
+                "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "method": method,
+                "route": route,
+                "status": status,
+                "duration_ms": round(duration * 1000, 3),
+                "queries": stats.queries,
+                "query_time_ms": round(stats.query_time * 1000, 3),
+                "statements": stats.statements,
+            }
+            self.slow_requests.append(sample)
+            logger.warning("Slow request %s %s took %.1fms with %d queries", method, route, duration * 1000, stats.queries)
+
+    def render(self, extra_sections: Sequence[str] = ()) -> str:
+        lines = ["# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(self.requests_total.items()):
+            lines.append(f"http_requests_total{_labels({'method': method, 'route': route, 'status': status})} {count}")
+
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for (method, route), histogram in sorted(self.request_latency.items()):
+            render_histogram(lines, "http_request_duration_seconds", histogram, {"method": method, "route": route})
+
+        lines.append("# TYPE db_queries_per_request histogram")
+        for (method, route), histogram in sorted(self.request_queries.items()):
+            render_histogram(lines, "db_queries_per_request", histogram, {"method": method, "route": route})
+
+        lines.append("# TYPE db_query_seconds_per_request histogram")
+        for (method, route), histogram in sorted(self.request_query_time.items()):
+            render_histogram(lines, "db_query_seconds_per_request", histogram, {"method": method, "route": route})
+
+        lines.append("# TYPE db_commit_duration_seconds histogram")
+        render_histogram(lines, "db_commit_duration_seconds", self.commit_latency)
+
+        lines.append("# TYPE db_pool_checkout_wait_seconds histogram")
+        render_histogram(lines, "db_pool_checkout_wait_seconds", self.pool_checkout_wait)
+
+        lines.extend(extra_sections)
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+def instrument_engine(engine):
+    # Query count/time per request via cursor events; commit latency and pool checkout
+    # wait by timing the dialect's do_commit and the pool's connect on this engine only.
+    sync_engine = engine.sync_engine
+    if getattr(sync_engine, "_bank_instrumented", False):
+        return
+    sync_engine._bank_instrumented = True
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info["query_started"] = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_execute(conn, cursor, statement, parameters, context, executemany):
+        stats = current_request_stats.get()
+        if stats is None:
+            return
+        elapsed = time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+        stats.queries += 1
+        stats.query_time += elapsed
+        if stats.statements is not None:
+            stats.statements.append({"sql": statement, "duration_ms": round(elapsed * 1000, 3)})
+
+    dialect = sync_engine.dialect
+    do_commit = dialect.do_commit
+
+    def timed_commit(dbapi_connection):
+        started = time.perf_counter()
+        try:
+            do_commit(dbapi_connection)
+        finally:
+            metrics.commit_latency.observe(time.perf_counter() - started)
+
+    dialect.do_commit = timed_commit
+
+    pool = sync_engine.pool
+    pool_connect = pool.connect
+
+    def timed_connect():
+        started = time.perf_counter()
+        try:
+            return pool_connect()
+        finally:
+            metrics.pool_checkout_wait.observe(time.perf_counter() - started)
+
+    pool.connect = timed_connect
+
+class MetricsMiddleware:
+    """Pure ASGI middleware: per-route latency plus the request's query count and query time."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(capture_sql=bool(SLOW_REQUEST_THRESHOLD_MS))
+        token = current_request_stats.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            # label by route template, never by raw path, to keep cardinality bounded
+            route_path = getattr(route, "path", None) or "unmatched"
+            metrics.observe_request(scope["method"], route_path, status, time.perf_counter() - started, stats)
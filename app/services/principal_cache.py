@@ -0,0 +1,77 @@
+from collections import OrderedDict
+from sqlalchemy import event
+from app.models.user import User
+from typing import Optional
+import os
+import time
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+
+class PrincipalCache:
+    """Bounded LRU of bearer token -> resolved user, each entry capped at the token's exp."""
+
+    def __init__(self, maxsize: int, ttl: int):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()
+
+    def get(self, token: str):
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at <= time.time():
+            del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return user
+
+    def put(self, token: str, user, token_exp: Optional[float] = None):
+        if self.maxsize <= 0:
+            return
+        expires_at = time.time() + self.ttl
+        if token_exp is not None:
+            expires_at = min(expires_at, token_exp)
+        self._entries[token] = (expires_at, user)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        stale = [token for token, (_, user) in self._entries.items() if user.id == user_id]
+        for token in stale:
+            del self._entries[token]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+
+# any flushed change to a user (deactivation, email/password change, deletion) drops their cached tokens
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    principal_cache.invalidate_user(target.id)
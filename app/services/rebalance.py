@@ -0,0 +1,152 @@
+from sqlalchemy import delete, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.database import AsyncSessionLocal, ShardSessionLocal, SHARD_COUNT
+from app.models.account import Account, AccountShard
+from app.models.rollup import AccountDailyRollup
+from app.models.snapshot import BalanceSnapshot
+from app.models.standing_order import StandingOrder
+from app.models.transaction import Transaction, ArchivedTransaction
+from app.models.transfer_outbox import TransferOutbox, OutboxStatus
+from app.services.archive import ledger_tiers
+from app.services.shards import place_account, raise_ledger_sequence, shard_directory
+from typing import Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+MOVE_CHUNK_ROWS = 5000
+
+ACCOUNT_COLUMNS = ("id", "account_number", "account_type", "balance", "owner_id", "created_at")
+ROLLUP_COLUMNS = ("account_id", "day", "transaction_type", "status", "txn_count", "amount_total", "inflow", "outflow")
+# snapshots point at ledger ids, which a move keeps
+SNAPSHOT_COLUMNS = ("account_id", "balance", "last_transaction_id", "taken_at", "created_at")
+
+class RebalanceError(Exception):
+    pass
+
+async def _load_directory() -> dict:
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(select(AccountShard.account_id, AccountShard.shard))
+        return dict(result.all())
+
+async def _delete_account_rows(db: AsyncSession, account_id: int):
+    for model in (Transaction, ArchivedTransaction, AccountDailyRollup, BalanceSnapshot):
+        await db.execute(delete(model).where(model.account_id == account_id))
+    await db.execute(delete(StandingOrder).where(StandingOrder.from_account_id == account_id))
+    await db.execute(delete(Account).where(Account.id == account_id))
+
+async def _copy_standing_orders(src: AsyncSession, dst: AsyncSession, account_id: int):
+    # orders live with their source account; ids are per shard, so one already taken on the
+    # target is replaced by a new one
+    orders = StandingOrder.__table__
+    result = await src.execute(select(*orders.c).where(orders.c.from_account_id == account_id))
+    rows = [dict(row._mapping) for row in result.all()]
+    if not rows:
+        return
+    taken = await dst.execute(select(orders.c.id).where(orders.c.id.in_([row["id"] for row in rows])))
+    taken = set(taken.scalars().all())
+    kept = [row for row in rows if row["id"] not in taken]
+    renumbered = [{key: value for key, value in row.items() if key != "id"} for row in rows if row["id"] in taken]
+    for batch in (kept, renumbered):
+        if batch:
+            await dst.execute(insert(orders), batch)
+
+async def move_account(account_id: int, source: int, target: int) -> int:
+    # 1. copy everything to the target in one transaction (clearing any copy an interrupted run left)
+    moved_rows = 0
+    async with ShardSessionLocal[source]() as src, ShardSessionLocal[target]() as dst:
+        result = await src.execute(
+            select(func.count()).select_from(TransferOutbox)
+            .where(TransferOutbox.from_account_id == account_id, TransferOutbox.status == OutboxStatus.pending)
+        )
+        if result.scalar_one():
+            raise RebalanceError(f"account {account_id} has undelivered transfers; let the relay finish first")
+        result = await src.execute(select(*(Account.__table__.c[name] for name in ACCOUNT_COLUMNS)).where(Account.id == account_id))
+        account = result.first()
+        if not account:
+            raise RebalanceError(f"account {account_id} is not on shard {source}")
+
+        await _delete_account_rows(dst, account_id)
+        await dst.execute(insert(Account.__table__).values(**account._mapping))
+        # every tier lands in the same tier on the target, ids included: outbox rows, reversal
+        # descriptions, snapshots, cursors and saved idempotent responses all refer to them
+        max_id = 0
+        for tier in ledger_tiers():
+            result = await src.stream(
+                select(*tier.__table__.c).where(tier.account_id == account_id).order_by(tier.id)
+            )
+            async for rows in result.partitions(MOVE_CHUNK_ROWS):
+                try:
+                    await dst.execute(insert(tier.__table__), [dict(row._mapping) for row in rows])
+                except IntegrityError:
+                    raise RebalanceError(
+                        f"account {account_id}: ledger ids already used on shard {target} "
+                        "(rows written before ledger ids were strided)"
+                    )
+                moved_rows += len(rows)
+                max_id = max(max_id, rows[-1].id)
+        # new rows on the target must sort after the moved ones
+        await raise_ledger_sequence(dst, max_id)
+        for model, columns in ((AccountDailyRollup, ROLLUP_COLUMNS), (BalanceSnapshot, SNAPSHOT_COLUMNS)):
+            result = await src.execute(
+                select(*(model.__table__.c[name] for name in columns)).where(model.account_id == account_id)
+            )
+            copies = [dict(row._mapping) for row in result.all()]
+            if copies:
+                await dst.execute(insert(model.__table__), copies)
+        await _copy_standing_orders(src, dst, account_id)
+        await dst.commit()
+
+    # 2. route the account to its new shard, 3. then drop the source copy
+    async with AsyncSessionLocal() as session:
+        await session.execute(update(AccountShard).where(AccountShard.account_id == account_id).values(shard=target))
+        await session.commit()
+    shard_directory.forget(account_id)
+    async with ShardSessionLocal[source]() as src:
+        await _delete_account_rows(src, account_id)
+        await src.commit()
+    return moved_rows
+
+async def _purge_strays(directory: dict) -> int:
+    # rows left on a shard the directory no longer points to (a run interrupted after step 2)
+    purged = 0
+    for shard, session_factory in enumerate(ShardSessionLocal):
+        async with session_factory() as session:
+            result = await session.execute(select(Account.id))
+            strays = [account_id for account_id in result.scalars().all() if directory.get(account_id, 0) != shard]
+            for account_id in strays:
+                await _delete_account_rows(session, account_id)
+            await session.commit()
+        purged += len(strays)
+    return purged
+
+async def rebalance_shards(dry_run: bool = False, limit: Optional[int] = None) -> int:
+    # Moves every account whose directory shard differs from its placement (id % shard count).
+    # Run it with the API stopped: writes to an account while it moves would be lost.
+    directory = await _load_directory()
+    moves = []
+    for account_id, shard in sorted(directory.items()):
+        target = place_account(account_id)
+        if shard == target:
+            continue
+        if shard >= SHARD_COUNT:
+            logger.warning("account %d: shard %d is not configured, skipped", account_id, shard)
+            continue
+        moves.append((account_id, shard, target))
+    if limit is not None:
+        moves = moves[:limit]
+
+    for account_id, source, target in moves:
+        if dry_run:
+            logger.info("account %d: shard %d -> %d", account_id, source, target)
+            continue
+        rows = await move_account(account_id, source, target)
+        logger.info("account %d: shard %d -> %d (%d ledger rows)", account_id, source, target, rows)
+
+    if not dry_run:
+        purged = await _purge_strays(await _load_directory())
+        if purged:
+            logger.info("Removed %d stale account copies", purged)
+    return len(moves)
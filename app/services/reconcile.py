@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from sqlalchemy import func, literal, union_all
+from sqlalchemy.future import select
+from app.database import ShardSessionLocal, SHARD_COUNT
+from app.models.account import Account
+from app.models.transaction import TransactionStatus, signed_amount
+from app.services.archive import ledger_tiers
+import asyncio
+import os
+
+RECONCILE_CHUNK_SIZE = int(os.getenv("RECONCILE_CHUNK_SIZE", "10000"))
+RECONCILE_CONCURRENCY = int(os.getenv("RECONCILE_CONCURRENCY", "4"))
+
+@dataclass
+class Mismatch:
+    shard: int
+    account_id: int
+    account_number: str
+    balance: Decimal
+    expected: Decimal
+
+    @property
+    def drift(self) -> Decimal:
+        # positive when the stored balance is above what the ledger supports
+        return self.balance - self.expected
+
+def _money(value) -> Decimal:
+    return Decimal(str(value)).quantize(Decimal("0.01"))
+
+def mismatch_query(low: int, high: int):
+    # Accounts in [low, high) whose balance differs from the net of their completed ledger rows
+    # in both tiers: one grouped pass per tier, joined back to the accounts in a single statement.
+    per_tier = union_all(*(
+        select(tier.account_id, func.sum(signed_amount(tier)).label("net"))
+        .where(
+            tier.account_id >= low,
+            tier.account_id < high,
+            tier.status == TransactionStatus.completed
+        )
+        .group_by(tier.account_id)
+        for tier in ledger_tiers()
+    )).subquery()
+    ledger = (
+        select(per_tier.c.account_id, func.sum(per_tier.c.net).label("net"))
+        .group_by(per_tier.c.account_id)
+        .subquery()
+    )
+    expected = func.coalesce(ledger.c.net, literal(0))
+    return (
+        select(Account.id, Account.account_number, Account.balance, expected.label("expected"))
+        .outerjoin(ledger, ledger.c.account_id == Account.id)
+        .where(Account.id >= low, Account.id < high, func.round(Account.balance - expected, 2) != 0)
+        .order_by(Account.id)
+    )
+
+async def _check_chunk(shard: int, low: int, high: int, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        async with ShardSessionLocal[shard]() as db:
+            result = await db.execute(mismatch_query(low, high))
+            return [
+                Mismatch(shard, row.id, row.account_number, _money(row.balance), _money(row.expected))
+                for row in result.all()
+            ]
+
+async def _id_range(shard: int):
+    async with ShardSessionLocal[shard]() as db:
+        result = await db.execute(select(func.min(Account.id), func.max(Account.id), func.count(Account.id)))
+        return result.one()
+
+async def reconcile(chunk_size: int = RECONCILE_CHUNK_SIZE, concurrency: int = RECONCILE_CONCURRENCY):
+    # Splits every shard's account ids into chunk_size ranges and checks up to `concurrency`
+    # chunks at once, each on its own connection. Returns (accounts checked, mismatches).
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    chunks = []
+    checked = 0
+    for shard in range(SHARD_COUNT):
+        low, high, count = await _id_range(shard)
+        if not count:
+            continue
+        checked += count
+        chunks.extend(
+            _check_chunk(shard, start, start + chunk_size, semaphore)
+            for start in range(low, high + 1, chunk_size)
+        )
+    mismatches = [mismatch for found in await asyncio.gather(*chunks) for mismatch in found]
+    mismatches.sort(key=lambda mismatch: mismatch.account_id)
+    return checked, mismatches
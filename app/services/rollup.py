@@ -0,0 +1,103 @@
+from decimal import Decimal
+from sqlalchemy import case, delete, func, insert, literal, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.models.rollup import AccountDailyRollup
+from app.models.transaction import TransactionStatus, signed_amount, signed_value
+from app.services.archive import ledger_tiers
+
+rollups = AccountDailyRollup.__table__
+
+def _upsert(dialect_name: str):
+    # increment existing (account, day, type, status) buckets, create missing ones
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    stmt = dialect_insert(rollups)
+    if dialect_name == "mysql":
+        new = stmt.inserted
+    else:
+        new = stmt.excluded
+    increments = {
+        "txn_count": rollups.c.txn_count + new.txn_count,
+        "amount_total": func.round(rollups.c.amount_total + new.amount_total, 2),
+        "inflow": func.round(rollups.c.inflow + new.inflow, 2),
+        "outflow": func.round(rollups.c.outflow + new.outflow, 2),
+    }
+    if dialect_name == "mysql":
+        return stmt.on_duplicate_key_update(**increments)
+    return stmt.on_conflict_do_update(
+        index_elements=["account_id", "day", "transaction_type", "status"],
+        set_=increments
+    )
+
+async def record_rollups(db: AsyncSession, ledger_rows):
+    # Folds freshly inserted ledger rows into the daily rollups inside the caller's transaction
+    buckets = {}
+    for row in ledger_rows:
+        key = (row.account_id, row.created_at.date(), row.transaction_type, row.status)
+        bucket = buckets.setdefault(key, [0, Decimal("0"), Decimal("0"), Decimal("0")])
+        amount = Decimal(str(row.amount))
+        bucket[0] += 1
+        bucket[1] += amount
+        if row.status == TransactionStatus.completed:
+            signed = signed_value(row)
+            if signed > 0:
+                bucket[2] += signed
+            else:
+                bucket[3] -= signed
+    if not buckets:
+        return
+
+    params = [
+        {
+            "account_id": account_id,
+            "day": day,
+            "transaction_type": transaction_type,
+            "status": status,
+            "txn_count": count,
+            "amount_total": total,
+            "inflow": inflow,
+            "outflow": outflow,
+        }
+        for (account_id, day, transaction_type, status), (count, total, inflow, outflow) in sorted(
+            buckets.items(), key=lambda item: (item[0][0], item[0][1])
+        )
+    ]
+    await db.execute(_upsert(db.bind.dialect.name), params)
+
+async def rebuild_rollups(db: AsyncSession) -> int:
+    # Recomputes every rollup from both ledger tiers with a single INSERT ... SELECT ... GROUP BY
+    ledger = union_all(*(
+        select(tier.account_id, tier.transaction_type, tier.status, tier.direction, tier.amount, tier.created_at)
+        for tier in ledger_tiers()
+    )).subquery().c
+    signed = signed_amount(ledger)
+    completed = ledger.status == TransactionStatus.completed
+    day = func.date(ledger.created_at)
+    aggregate = (
+        select(
+            ledger.account_id,
+            day,
+            ledger.transaction_type,
+            ledger.status,
+            func.count(),
+            func.coalesce(func.sum(ledger.amount), 0),
+            func.coalesce(func.sum(case((completed & (signed > 0), signed), else_=literal(0))), 0),
+            func.coalesce(func.sum(case((completed & (signed < 0), -signed), else_=literal(0))), 0),
+        )
+        .group_by(ledger.account_id, day, ledger.transaction_type, ledger.status)
+    )
+    await db.execute(delete(AccountDailyRollup))
+    result = await db.execute(
+        insert(AccountDailyRollup).from_select(
+            ["account_id", "day", "transaction_type", "status", "txn_count", "amount_total", "inflow", "outflow"],
+            aggregate
+        )
+    )
+    await db.commit()
+    return result.rowcount
@@ -0,0 +1,61 @@
+from sqlalchemy import func, inspect, text
+from app.models.transaction import LEDGER_TIERS, inferred_direction
+from app.models.transfer_outbox import TransferOutbox
+
+# shard-resident tables whose user reference cannot be a foreign key: users are on the primary only
+USER_REFERENCING_TABLES = ("accounts", "idempotency_keys")
+
+DROP_FOREIGN_KEY = {
+    "postgresql": "ALTER TABLE {table} DROP CONSTRAINT {name}",
+    "mysql": "ALTER TABLE {table} DROP FOREIGN KEY {name}",
+}
+
+# nullable columns added to a table after it was first created
+ADDED_COLUMNS = ((TransferOutbox.__table__, "description"),)
+
+def _add_missing_columns(conn, inspector):
+    for table, name in ADDED_COLUMNS:
+        if name in {column["name"] for column in inspector.get_columns(table.name)}:
+            continue
+        column_type = table.c[name].type.compile(dialect=conn.dialect)
+        conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {name} {column_type}"))
+
+def _drop_user_foreign_keys(conn, inspector):
+    # SQLite never enforced them; server databases created before the keys were dropped still have them
+    statement = DROP_FOREIGN_KEY.get(conn.dialect.name)
+    if statement is None:
+        return
+    for table in USER_REFERENCING_TABLES:
+        for foreign_key in inspector.get_foreign_keys(table):
+            if foreign_key["referred_table"] == "users" and foreign_key["name"]:
+                conn.execute(text(statement.format(table=table, name=foreign_key["name"])))
+
+def _truncate_ledger_timestamps(conn, table):
+    # SQLite ledgers written before LedgerTimestamp hold imported and moved rows with fractional
+    # seconds; cut them to the whole-second form every other row has so they compare as text
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(
+        table.update()
+        .where(func.length(table.c.created_at) > 19)
+        .values(created_at=func.substr(table.c.created_at, 1, 19))
+    )
+
+def upgrade_schema(conn):
+    # create_all never alters existing tables. Ledgers created before the direction column get
+    # it added here and backfilled from the type/description convention they were written with.
+    inspector = inspect(conn)
+    _drop_user_foreign_keys(conn, inspector)
+    _add_missing_columns(conn, inspector)
+    for tier in LEDGER_TIERS:
+        table = tier.__table__
+        _truncate_ledger_timestamps(conn, table)
+        if "direction" in {column["name"] for column in inspector.get_columns(table.name)}:
+            continue
+        column_type = table.c.direction.type
+        # a native enum type (PostgreSQL) has to exist before the column can use it
+        column_type.create(conn, checkfirst=True)
+        conn.execute(text(
+            f"ALTER TABLE {table.name} ADD COLUMN direction {column_type.compile(dialect=conn.dialect)}"
+        ))
+        conn.execute(table.update().values(direction=inferred_direction(tier)))
@@ -0,0 +1,55 @@
+from decimal import Decimal
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import TypeAdapter
+from app.schemas.account import AccountResponse
+from app.schemas.transaction import TransactionResponse
+from app.schemas.user import UserResponse
+from typing import List, Optional
+
+try:
+    import orjson
+except ImportError:  # falls back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # MessagePack is only offered when installed
+    msgpack = None
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# built once at import: validating and encoding through these skips building a model class per call
+transaction_adapter = TypeAdapter(TransactionResponse)
+transaction_list_adapter = TypeAdapter(List[TransactionResponse])
+account_list_adapter = TypeAdapter(List[AccountResponse])
+user_adapter = TypeAdapter(UserResponse)
+
+def _encode_default(value):
+    # money stays exact: a Decimal goes out as its string form, never as a float
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+class FastJSONResponse(JSONResponse):
+    # Default response class for the app
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content, default=_encode_default, option=orjson.OPT_NON_STR_KEYS)
+
+def wants_msgpack(request: Request) -> bool:
+    accept = request.headers.get("accept", "")
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+def render(
+    request: Request, adapter: TypeAdapter, content, status_code: int = 200, headers: Optional[dict] = None
+) -> Response:
+    # Validates ORM objects or Core rows straight from their attributes and encodes them in
+    # pydantic-core, bypassing FastAPI's response_model round trip through Python dicts.
+    value = adapter.validate_python(content, from_attributes=True)
+    headers = {**(headers or {}), "Vary": "Accept"}
+    if wants_msgpack(request):
+        body = msgpack.packb(adapter.dump_python(value, mode="json"))
+        return Response(body, status_code=status_code, headers=headers, media_type=MSGPACK_MEDIA_TYPES[0])
+    return Response(adapter.dump_json(value), status_code=status_code, headers=headers, media_type="application/json")
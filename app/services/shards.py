@@ -0,0 +1,183 @@
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from sqlalchemy import case, func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+from app.database import AsyncSessionLocal, ShardSessionLocal, ShardReadSessionLocal, SHARD_COUNT, shard_engines
+from app.models.account import Account, AccountNumberSequence, AccountShard
+from app.models.transaction import LEDGER_TIERS
+import asyncio
+import os
+
+SHARD_DIRECTORY_CACHE_SIZE = int(os.getenv("SHARD_DIRECTORY_CACHE_SIZE", "100000"))
+
+# row ids in account_number_sequences
+ACCOUNT_NUMBER_SEQUENCE = 1
+ACCOUNT_ID_SEQUENCE = 2
+# kept on every shard, in that shard's own table
+LEDGER_ID_SEQUENCE = 3
+
+# With several shards, ledger ids are strided: every id on shard n is n modulo the stride. Ids are
+# then unique across shards, and a rebalanced row keeps its id. It caps the number of databases.
+LEDGER_ID_STRIDE = 16
+if SHARD_COUNT > LEDGER_ID_STRIDE:
+    raise RuntimeError(f"At most {LEDGER_ID_STRIDE} databases are supported, got {SHARD_COUNT}")
+
+class ShardDirectory:
+    """account id -> shard, read from account_shards on the primary and kept in an LRU.
+
+    Only found rows are cached: an id that does not exist yet may be placed later.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def _put(self, account_id: int, shard: int):
+        self._entries[account_id] = shard
+        self._entries.move_to_end(account_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def shard_for(self, account_id: int) -> int:
+        if SHARD_COUNT == 1:
+            return 0
+        shard = self._entries.get(account_id)
+        if shard is not None:
+            self._entries.move_to_end(account_id)
+            self.hits += 1
+            return shard
+        self.misses += 1
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(select(AccountShard.shard).where(AccountShard.account_id == account_id))
+            shard = result.scalar_one_or_none()
+        if shard is None:
+            # unknown account: the primary answers with the usual 404
+            return 0
+        self._put(account_id, shard)
+        return shard
+
+    async def assign(self, placements: dict):
+        # commits on the primary before the accounts are written to their shards
+        async with AsyncSessionLocal() as session:
+            await session.execute(
+                insert(AccountShard),
+                [{"account_id": account_id, "shard": shard} for account_id, shard in placements.items()]
+            )
+            await session.commit()
+        for account_id, shard in placements.items():
+            self._put(account_id, shard)
+
+    def forget(self, account_id: int):
+        self._entries.pop(account_id, None)
+
+shard_directory = ShardDirectory(SHARD_DIRECTORY_CACHE_SIZE)
+
+def place_account(account_id: int) -> int:
+    return account_id % SHARD_COUNT
+
+@asynccontextmanager
+async def account_session(account_id: int, read: bool = False):
+    shard = await shard_directory.shard_for(account_id)
+    factories = ShardReadSessionLocal if read else ShardSessionLocal
+    async with factories[shard]() as session:
+        yield session
+
+async def for_each_shard(fn, read: bool = False):
+    # fn(session, shard) on every shard concurrently, each with its own session
+    factories = ShardReadSessionLocal if read else ShardSessionLocal
+
+    async def run(shard: int):
+        async with factories[shard]() as session:
+            return await fn(session, shard)
+
+    return await asyncio.gather(*(run(shard) for shard in range(SHARD_COUNT)))
+
+def shard_of(db) -> int:
+    return shard_engines.index(db.bind)
+
+async def allocate_ledger_ids(db, count: int) -> list:
+    # Bumped inside the caller's transaction, so the row lock hands out ids in commit order,
+    # which event replay (id > Last-Event-ID) relies on.
+    shard = shard_of(db)
+    result = await db.execute(
+        update(AccountNumberSequence)
+        .where(AccountNumberSequence.id == LEDGER_ID_SEQUENCE)
+        .values(next_value=AccountNumberSequence.next_value + count)
+        .returning(AccountNumberSequence.next_value)
+    )
+    end = result.scalar_one()
+    return [value * LEDGER_ID_STRIDE + shard for value in range(end - count, end)]
+
+async def raise_sequence(db, sequence_id: int, floor: int):
+    # next_value becomes at least floor; a missing row is created
+    next_value = AccountNumberSequence.next_value
+    result = await db.execute(
+        update(AccountNumberSequence)
+        .where(AccountNumberSequence.id == sequence_id)
+        .values(next_value=case((next_value < floor, floor), else_=next_value))
+    )
+    if result.rowcount == 0:
+        await db.execute(insert(AccountNumberSequence).values(id=sequence_id, next_value=floor))
+
+async def raise_ledger_sequence(db, above_id: int):
+    # the shard's next ledger id will be above above_id
+    await raise_sequence(db, LEDGER_ID_SEQUENCE, above_id // LEDGER_ID_STRIDE + 1)
+
+async def _max_ledger_id(session) -> int:
+    result = await session.execute(
+        select(*(select(func.coalesce(func.max(tier.id), 0)).scalar_subquery() for tier in LEDGER_TIERS))
+    )
+    return max(result.one())
+
+async def prepare_shards():
+    # Once per start with more than one shard: give pre-existing primary accounts a directory
+    # row, and start the global account id sequence and every shard's ledger id sequence above
+    # every id on any shard.
+    if SHARD_COUNT == 1:
+        return
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            insert(AccountShard).from_select(
+                ["account_id", "shard"],
+                select(Account.id, 0).where(~Account.id.in_(select(AccountShard.account_id)))
+            )
+        )
+        await session.commit()
+
+    next_value = max(await for_each_shard(lambda session, shard: _max_account_id(session))) + 1
+    async with AsyncSessionLocal() as session:
+        exists = await session.execute(
+            select(AccountNumberSequence.id).where(AccountNumberSequence.id == ACCOUNT_ID_SEQUENCE)
+        )
+        if exists.scalar_one_or_none() is None:
+            session.add(AccountNumberSequence(id=ACCOUNT_ID_SEQUENCE, next_value=next_value))
+            try:
+                await session.commit()
+            except IntegrityError:
+                # another worker seeded it first
+                await session.rollback()
+        else:
+            # accounts created while running on a single shard used the primary's own ids
+            await session.execute(
+                update(AccountNumberSequence)
+                .where(AccountNumberSequence.id == ACCOUNT_ID_SEQUENCE, AccountNumberSequence.next_value < next_value)
+                .values(next_value=next_value)
+            )
+            await session.commit()
+
+    max_ledger_id = max(await for_each_shard(lambda session, shard: _max_ledger_id(session)))
+    for session_factory in ShardSessionLocal:
+        async with session_factory() as session:
+            await raise_ledger_sequence(session, max_ledger_id)
+            try:
+                await session.commit()
+            except IntegrityError:
+                # another worker seeded it first, at least as high
+                await session.rollback()
+
+async def _max_account_id(session) -> int:
+    result = await session.execute(select(func.coalesce(func.max(Account.id), 0)))
+    return result.scalar_one()
@@ -0,0 +1,244 @@
+from calendar import monthrange
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from fastapi import HTTPException
+from sqlalchemy import bindparam, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.database import ShardSessionLocal, SHARD_COUNT
+from app.models.account import Account
+from app.models.standing_order import StandingOrder, Frequency, RunStatus
+from app.schemas.standing_order import StandingOrderCreate, StandingOrderUpdate
+from app.schemas.transaction import BatchItem, BatchOperation, TransferRequest
+from app.services.shards import shard_directory
+from app.services.transaction import apply_batch_items, get_owned_account
+from app.services.transfer_outbox import apply_outbound_transfer, deliver_pending
+from typing import Optional
+import asyncio
+import logging
+import os
+
+STANDING_ORDER_INTERVAL_SECONDS = int(os.getenv("STANDING_ORDER_INTERVAL_SECONDS", "60"))
+STANDING_ORDER_BATCH_SIZE = int(os.getenv("STANDING_ORDER_BATCH_SIZE", "1000"))
+STANDING_ORDER_MAX_FAILURES = int(os.getenv("STANDING_ORDER_MAX_FAILURES", "3"))
+
+logger = logging.getLogger(__name__)
+
+run_counts = {"completed": 0, "failed": 0}
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # the ledger stores naive UTC timestamps
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _advance(run_at: datetime, frequency: Frequency, day_of_month: int) -> datetime:
+    if frequency == Frequency.daily:
+        return run_at + timedelta(days=1)
+    if frequency == Frequency.weekly:
+        return run_at + timedelta(weeks=1)
+    year, month = (run_at.year + 1, 1) if run_at.month == 12 else (run_at.year, run_at.month + 1)
+    return run_at.replace(year=year, month=month, day=min(day_of_month, monthrange(year, month)[1]))
+
+def following_run(order, now: datetime) -> datetime:
+    # first occurrence after now: runs missed while the scheduler was down are not replayed
+    run_at = order.next_run_at
+    while run_at <= now:
+        run_at = _advance(run_at, order.frequency, order.starts_at.day)
+    return run_at
+
+async def _check_amount_and_destination(amount: Decimal, from_account_id: int, to_account_id: int):
+    if amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be greater than 0")
+    if from_account_id == to_account_id:
+        raise HTTPException(status_code=400, detail="Cannot transfer to same account")
+    async with ShardSessionLocal[await shard_directory.shard_for(to_account_id)]() as session:
+        result = await session.execute(select(Account.id).where(Account.id == to_account_id))
+        if result.scalar_one_or_none() is None:
+            raise HTTPException(status_code=404, detail="Destination account not found")
+
+async def create_standing_order(db: AsyncSession, account_id: int, user_id: int, data: StandingOrderCreate):
+    await get_owned_account(db, account_id, user_id)
+    await _check_amount_and_destination(data.amount, account_id, data.to_account_id)
+    starts_at = _utc(data.starts_at) or datetime.utcnow()
+    ends_at = _utc(data.ends_at)
+    if ends_at and ends_at < starts_at:
+        raise HTTPException(status_code=400, detail="ends_at is before starts_at")
+
+    order = StandingOrder(
+        owner_id=user_id,
+        from_account_id=account_id,
+        to_account_id=data.to_account_id,
+        amount=data.amount,
+        description=data.description,
+        frequency=data.frequency,
+        starts_at=starts_at,
+        next_run_at=starts_at,
+        ends_at=ends_at,
+        active=True,
+        failed_runs=0
+    )
+    db.add(order)
+    await db.commit()
+    return order
+
+async def list_standing_orders(db: AsyncSession, account_id: int, user_id: int):
+    await get_owned_account(db, account_id, user_id)
+    result = await db.execute(
+        select(StandingOrder)
+        .where(StandingOrder.from_account_id == account_id)
+        .order_by(StandingOrder.id)
+    )
+    return result.scalars().all()
+
+async def get_standing_order(db: AsyncSession, account_id: int, order_id: int, user_id: int):
+    await get_owned_account(db, account_id, user_id)
+    result = await db.execute(
+        select(StandingOrder)
+        .where(StandingOrder.id == order_id, StandingOrder.from_account_id == account_id)
+    )
+    order = result.scalar_one_or_none()
+    if not order:
+        raise HTTPException(status_code=404, detail="Standing order not found")
+    return order
+
+async def update_standing_order(
+    db: AsyncSession, account_id: int, order_id: int, user_id: int, data: StandingOrderUpdate
+):
+    order = await get_standing_order(db, account_id, order_id, user_id)
+    changes = data.model_dump(exclude_unset=True)
+    # only ends_at and description can be cleared
+    for field in ("amount", "frequency", "next_run_at", "active"):
+        if changes.get(field) is None:
+            changes.pop(field, None)
+    if "amount" in changes:
+        await _check_amount_and_destination(changes["amount"], order.from_account_id, order.to_account_id)
+    for field in ("next_run_at", "ends_at"):
+        if field in changes:
+            changes[field] = _utc(changes[field])
+    if changes.get("active"):
+        # re-enabling clears the failure streak
+        changes["failed_runs"] = 0
+
+    for field, value in changes.items():
+        setattr(order, field, value)
+    await db.commit()
+    return order
+
+async def delete_standing_order(db: AsyncSession, account_id: int, order_id: int, user_id: int):
+    order = await get_standing_order(db, account_id, order_id, user_id)
+    await db.delete(order)
+    await db.commit()
+
+# Core executemany: the dict keys besides order_id become the SET clause
+_record_run = update(StandingOrder.__table__).where(StandingOrder.__table__.c.id == bindparam("order_id"))
+
+def _after_run(order, error: Optional[str], now: datetime) -> dict:
+    failed_runs = order.failed_runs + 1 if error else 0
+    next_run_at = following_run(order, now)
+    active = failed_runs < STANDING_ORDER_MAX_FAILURES and not (order.ends_at and next_run_at > order.ends_at)
+    return {
+        "order_id": order.id,
+        "next_run_at": next_run_at,
+        "last_run_at": now,
+        "last_status": RunStatus.failed if error else RunStatus.completed,
+        "last_error": error[:255] if error else None,
+        "failed_runs": failed_runs,
+        "active": active,
+    }
+
+async def _run_orders(db: AsyncSession, shard: int, orders):
+    # order id -> error (None when the transfer went through), all inside db's transaction;
+    # also whether any order went to another shard through the outbox
+    local, remote = [], []
+    for order in orders:
+        (local if await shard_directory.shard_for(order.to_account_id) == shard else remote).append(order)
+
+    errors = {}
+    if local:
+        # one locked, lock-ordered pass for every same-shard order, as in /transactions/batch
+        legs = [
+            (BatchItem(
+                operation=BatchOperation.transfer,
+                account_id=order.from_account_id,
+                to_account_id=order.to_account_id,
+                amount=Decimal(str(order.amount)),
+                description=order.description
+            ), order.owner_id)
+            for order in local
+        ]
+        for order, item_result in zip(local, await apply_batch_items(db, legs, atomic=False)):
+            errors[order.id] = item_result.error
+    for order in remote:
+        data = TransferRequest(
+            from_account_id=order.from_account_id,
+            to_account_id=order.to_account_id,
+            amount=Decimal(str(order.amount)),
+            description=order.description
+        )
+        try:
+            await apply_outbound_transfer(db, data, order.owner_id)
+            errors[order.id] = None
+        except HTTPException as exc:
+            errors[order.id] = str(exc.detail)
+    return errors, bool(remote)
+
+async def run_due_orders(shard: int, now: Optional[datetime] = None, batch_size: int = STANDING_ORDER_BATCH_SIZE) -> int:
+    # Executes every order due on one shard, batch_size orders per commit; each commit holds the
+    # transfers and the orders' next run dates together, so an order can never run twice.
+    now = now or datetime.utcnow()
+    executed = 0
+    cross_shard = False
+    async with ShardSessionLocal[shard]() as db:
+        while True:
+            result = await db.execute(
+                select(*StandingOrder.__table__.c)
+                .where(StandingOrder.active.is_(True), StandingOrder.next_run_at <= now)
+                .order_by(StandingOrder.next_run_at, StandingOrder.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            orders = result.all()
+            if not orders:
+                break
+            errors, sent_remote = await _run_orders(db, shard, orders)
+            await db.execute(_record_run, [_after_run(order, errors[order.id], now) for order in orders])
+            await db.commit()
+
+            executed += len(orders)
+            failed = sum(1 for error in errors.values() if error)
+            run_counts["failed"] += failed
+            run_counts["completed"] += len(orders) - failed
+            cross_shard = cross_shard or sent_remote
+    if cross_shard:
+        try:
+            await deliver_pending(shard)
+        except Exception:
+            logger.exception("Standing order delivery failed, left to the relay")
+    return executed
+
+async def run_scheduler():
+    while True:
+        for shard in range(SHARD_COUNT):
+            try:
+                await run_due_orders(shard)
+            except Exception:
+                logger.exception("Standing order run failed on shard %d", shard)
+        await asyncio.sleep(STANDING_ORDER_INTERVAL_SECONDS)
+
+_scheduler_task = None
+
+def start_scheduler():
+    global _scheduler_task
+    _scheduler_task = asyncio.create_task(run_scheduler())
+
+async def stop_scheduler():
+    global _scheduler_task
+    if not _scheduler_task:
+        return
+    _scheduler_task.cancel()
+    try:
+        await _scheduler_task
+    except asyncio.CancelledError:
+        pass
+    _scheduler_task = None
@@ -0,0 +1,184 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func, insert, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.database import ShardSessionLocal
+from app.models.snapshot import BalanceSnapshot
+from app.models.transaction import TransactionStatus, signed_amount, signed_value
+from app.services.archive import ledger_tiers
+from app.services.transaction import get_owned_account
+from typing import Optional
+import asyncio
+import logging
+import os
+
+SNAPSHOT_EVERY_N_TRANSACTIONS = int(os.getenv("SNAPSHOT_EVERY_N_TRANSACTIONS", "500"))
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", "86400"))
+SNAPSHOT_INTERVAL_SECONDS = int(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "60"))
+
+logger = logging.getLogger(__name__)
+
+def _latest_snapshots():
+    # newest snapshot per account as a subquery (account_id, last_transaction_id)
+    return (
+        select(
+            BalanceSnapshot.account_id,
+            func.max(BalanceSnapshot.last_transaction_id).label("last_transaction_id")
+        )
+        .group_by(BalanceSnapshot.account_id)
+        .subquery()
+    )
+
+def _movement_since_snapshot(tier, latest):
+    since_id = func.coalesce(latest.c.last_transaction_id, 0)
+    return (
+        select(
+            tier.account_id.label("account_id"),
+            func.count().label("pending"),
+            func.sum(signed_amount(tier)).label("net"),
+            func.max(tier.id).label("last_id"),
+            func.max(tier.created_at).label("last_at"),
+            latest.c.last_transaction_id.label("prev_id")
+        )
+        .outerjoin(latest, latest.c.account_id == tier.account_id)
+        .where(tier.id > since_id, tier.status == TransactionStatus.completed)
+        .group_by(tier.account_id, latest.c.last_transaction_id)
+    )
+
+async def take_snapshots(db: AsyncSession) -> int:
+    # One set-based pass: net ledger movement per account since its latest snapshot, summed
+    # over both ledger tiers in case rows were archived before a snapshot covered them
+    latest = _latest_snapshots()
+    per_tier = union_all(*(_movement_since_snapshot(tier, latest) for tier in ledger_tiers())).subquery()
+    result = await db.execute(
+        select(
+            per_tier.c.account_id,
+            func.sum(per_tier.c.pending).label("pending"),
+            func.sum(per_tier.c.net).label("net"),
+            func.max(per_tier.c.last_id).label("last_id"),
+            func.max(per_tier.c.last_at).label("last_at"),
+            func.max(per_tier.c.prev_id).label("prev_id")
+        )
+        .group_by(per_tier.c.account_id)
+    )
+    pending = result.all()
+    if not pending:
+        return 0
+
+    prev_ids = [row.prev_id for row in pending if row.prev_id is not None]
+    previous = {}
+    if prev_ids:
+        prev_result = await db.execute(
+            select(BalanceSnapshot.account_id, BalanceSnapshot.balance, BalanceSnapshot.taken_at)
+            .where(BalanceSnapshot.last_transaction_id.in_(prev_ids))
+        )
+        previous = {row.account_id: row for row in prev_result.all()}
+
+    # snapshot an account every N rows, or once its latest snapshot is older than the max age
+    stale_before = datetime.utcnow() - timedelta(seconds=SNAPSHOT_MAX_AGE_SECONDS)
+    rows = []
+    for row in pending:
+        prev = previous.get(row.account_id)
+        if row.pending < SNAPSHOT_EVERY_N_TRANSACTIONS and prev and prev.taken_at > stale_before:
+            continue
+        opening = Decimal(str(prev.balance)) if prev else Decimal("0")
+        rows.append({
+            "account_id": row.account_id,
+            "balance": opening + Decimal(str(row.net)),
+            "last_transaction_id": row.last_id,
+            "taken_at": row.last_at,
+        })
+
+    if rows:
+        await db.execute(insert(BalanceSnapshot), rows)
+        await db.commit()
+    return len(rows)
+
+async def balance_as_of(db: AsyncSession, account_id: int, as_of: datetime) -> Decimal:
+    # nearest snapshot before the point in time, plus the ledger rows between it and as_of
+    result = await db.execute(
+        select(BalanceSnapshot.balance, BalanceSnapshot.last_transaction_id)
+        .where(BalanceSnapshot.account_id == account_id, BalanceSnapshot.taken_at < as_of)
+        .order_by(BalanceSnapshot.last_transaction_id.desc())
+        .limit(1)
+    )
+    snapshot = result.first()
+    balance = Decimal(str(snapshot.balance)) if snapshot else Decimal("0")
+    since_id = snapshot.last_transaction_id if snapshot else 0
+
+    for tier in ledger_tiers():
+        result = await db.execute(
+            select(func.coalesce(func.sum(signed_amount(tier)), 0))
+            .where(
+                tier.account_id == account_id,
+                tier.id > since_id,
+                tier.created_at < as_of,
+                tier.status == TransactionStatus.completed
+            )
+        )
+        balance += Decimal(str(result.scalar_one()))
+    return balance
+
+async def get_statement(
+    db: AsyncSession,
+    account_id: int,
+    user_id: int,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+):
+    await get_owned_account(db, account_id, user_id)
+
+    opening = await balance_as_of(db, account_id, from_date) if from_date else Decimal("0")
+
+    # oldest first: archived rows, then the hot table
+    transactions = []
+    for tier in ledger_tiers():
+        query = select(tier).where(tier.account_id == account_id)
+        if from_date:
+            query = query.where(tier.created_at >= from_date)
+        if to_date:
+            query = query.where(tier.created_at <= to_date)
+        result = await db.execute(query.order_by(tier.created_at.asc(), tier.id.asc()))
+        transactions.extend(result.scalars().all())
+
+    closing = opening + sum(
+        (signed_value(txn) for txn in transactions if txn.status == TransactionStatus.completed),
+        Decimal("0")
+    )
+
+    return {
+        "account_id": account_id,
+        "period_start": from_date,
+        "period_end": to_date,
+        "opening_balance": opening.quantize(Decimal("0.01")),
+        "closing_balance": closing.quantize(Decimal("0.01")),
+        "transactions": transactions,
+    }
+
+async def run_snapshotter():
+    while True:
+        for session_factory in ShardSessionLocal:
+            try:
+                async with session_factory() as session:
+                    await take_snapshots(session)
+            except Exception:
+                logger.exception("Balance snapshot pass failed")
+        await asyncio.sleep(SNAPSHOT_INTERVAL_SECONDS)
+
+_snapshot_task = None
+
+def start_snapshotter():
+    global _snapshot_task
+    _snapshot_task = asyncio.create_task(run_snapshotter())
+
+async def stop_snapshotter():
+    global _snapshot_task
+    if not _snapshot_task:
+        return
+    _snapshot_task.cancel()
+    try:
+        await _snapshot_task
+    except asyncio.CancelledError:
+        pass
+    _snapshot_task = None
@@ -1,89 +1,133 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import func, insert, update
 from fastapi import HTTPException
-from app.models.transaction import Transaction, TransactionType, TransactionStatus
+from app.database import SHARD_COUNT
+from app.services.archive import keyset_filter, ledger_tiers, read_tiers
+from app.services.events import queue_for_publish
+from app.services.rollup import record_rollups
+from app.services.serialization import transaction_adapter
+from app.services.shards import account_session, allocate_ledger_ids, shard_directory
+from app.services.velocity import velocity_limits, hold_until_commit, VelocityLimitExceeded
+from app.models.transaction import Transaction, TransactionType, TransactionStatus, EntryDirection
 from app.models.account import Account
-from app.schemas.transaction import DepositWithdrawRequest, TransferRequest
+from app.schemas.transaction import (
+    DepositWithdrawRequest, TransferRequest, BatchRequest, BatchOperation, BatchMode,
+    BatchItemResult, BatchResponse
+)
+from datetime import datetime
 from decimal import Decimal
+from typing import Optional
+import base64
 
-async def deposit(db: AsyncSession, data: DepositWithdrawRequest, user_id: int):
-    result = await db.execute(select(Account).where(Account.id == data.account_id))
-    account = result.scalar_one_or_none()
+ledger = Transaction.__table__
 
-    if not account:
-        raise HTTPException(status_code=404, detail="Account not found")
-    if account.owner_id != user_id:
-        raise HTTPException(status_code=403, detail="Not your account")
-    if data.amount <= 0:
-        raise HTTPException(status_code=400, detail="Amount must be greater than 0")
+def _ledger_row(
+    amount: Decimal, transaction_type: TransactionType, direction: EntryDirection, description, account_id: int
+) -> dict:
+    return {
+        "amount": amount,
+        "transaction_type": transaction_type,
+        "status": TransactionStatus.completed,
+        "direction": direction,
+        "description": description,
+        "account_id": account_id,
+    }
 
-    account.balance = Decimal(str(account.balance)) + data.amount
+def transfer_description(prefix: str, description: Optional[str]) -> str:
+    # a transfer's own description follows the "Transfer to/from account ..." text of its legs
+    return f"{prefix}: {description}"[:255] if description else prefix
 
-    txn = Transaction(
-        amount=data.amount,
-        transaction_type=TransactionType.deposit,
-        status=TransactionStatus.completed,
-        description=data.description,
-        account_id=account.id
-    )
-    db.add(txn)
-    await db.commit()
-    await db.refresh(txn)
-    return txn
+async def _insert_ledger_rows(db: AsyncSession, rows: list):
+    # Core INSERT ... RETURNING: no ORM instances, no identity map, no refresh() round trip.
+    # The daily rollups are updated in the same transaction, so they commit with the ledger;
+    # the rows are handed to the event stream once that commit succeeds.
+    if SHARD_COUNT > 1:
+        rows = [{**row, "id": txn_id} for row, txn_id in zip(rows, await allocate_ledger_ids(db, len(rows)))]
+    result = await db.execute(insert(ledger).returning(*ledger.c), rows)
+    # sort_by_parameter_order would make SQLite run one INSERT per row; ids are handed out in
+    # VALUES order, so sorting by id gives the rows back in parameter order
+    inserted = sorted(result.all(), key=lambda row: row.id)
+    await record_rollups(db, inserted)
+    queue_for_publish(db, inserted)
+    return inserted
 
-async def withdraw(db: AsyncSession, data: DepositWithdrawRequest, user_id: int):
-    result = await db.execute(select(Account).where(Account.id == data.account_id).with_for_update())
-    account = result.scalar_one_or_none()
+async def _adjust_balance(db: AsyncSession, account_id: int, delta: Decimal, owner_id: Optional[int] = None):
+    # Single-statement read-modify-write; debits only match while the balance covers them
+    query = (
+        update(Account)
+        .where(Account.id == account_id)
+        .values(balance=func.round(Account.balance + delta, 2))
+        .returning(Account.id, Account.account_number)
+    )
+    if owner_id is not None:
+        query = query.where(Account.owner_id == owner_id)
+    if delta < 0:
+        query = query.where(Account.balance >= -delta)
+    result = await db.execute(query)
+    return result.first()
 
-    if not account:
+async def _raise_account_error(db: AsyncSession, account_id: int, user_id: int, amount: Decimal):
+    # Cold path: only runs after a conditional UPDATE matched nothing (so nothing changed), to report why
+    result = await db.execute(select(Account.owner_id).where(Account.id == account_id))
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
         raise HTTPException(status_code=404, detail="Account not found")
-    if account.owner_id != user_id:
+    if owner_id != user_id:
         raise HTTPException(status_code=403, detail="Not your account")
-    if data.amount <= 0:
+    if amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be greater than 0")
-    if Decimal(str(account.balance)) < data.amount:
-        raise HTTPException(status_code=400, detail="Insufficient funds")
+    raise HTTPException(status_code=400, detail="Insufficient funds")
 
-    account.balance = Decimal(str(account.balance)) - data.amount
+async def apply_deposit(db: AsyncSession, data: DepositWithdrawRequest, user_id: int):
+    # Applies a deposit inside the caller's transaction without committing
+    if data.amount <= 0:
+        await _raise_account_error(db, data.account_id, user_id, data.amount)
 
-    txn = Transaction(
-        amount=data.amount,
-        transaction_type=TransactionType.withdrawal,
-        status=TransactionStatus.completed,
-        description=data.description,
-        account_id=account.id
-    )
-    db.add(txn)
+    if not await _adjust_balance(db, data.account_id, data.amount, owner_id=user_id):
+        await _raise_account_error(db, data.account_id, user_id, data.amount)
+
+    txn, = await _insert_ledger_rows(db, [
+        _ledger_row(data.amount, TransactionType.deposit, EntryDirection.credit, data.description, data.account_id)
+    ])
+    return txn
+
+async def deposit(db: AsyncSession, data: DepositWithdrawRequest, user_id: int):
+    txn = await apply_deposit(db, data, user_id)
     await db.commit()
-    await db.refresh(txn)
     return txn
 
-async def transfer(db: AsyncSession, data: TransferRequest, user_id: int):
-    # 1. Prevent circular wait by determining a strict locking order
-    first_lock_id = min(data.from_account_id, data.to_account_id)
-    second_lock_id = max(data.from_account_id, data.to_account_id)
+async def apply_withdraw(db: AsyncSession, data: DepositWithdrawRequest, user_id: int):
+    # Applies a withdrawal inside the caller's transaction without committing
+    if data.amount <= 0:
+        await _raise_account_error(db, data.account_id, user_id, data.amount)
 
-    # 2. Lock the first account (smaller ID)
-    res1 = await db.execute(
-        select(Account).where(Account.id == first_lock_id).with_for_update()
-    )
-    account_1 = res1.scalar_one_or_none()
+    # velocity limits are checked against in-memory windows before the balance is touched
+    async with velocity_limits.reserve(db, data.account_id, user_id, TransactionType.withdrawal, data.amount):
+        if not await _adjust_balance(db, data.account_id, -data.amount, owner_id=user_id):
+            await _raise_account_error(db, data.account_id, user_id, data.amount)
 
-    # 3. Lock the second account (larger ID)
-    res2 = await db.execute(
-        select(Account).where(Account.id == second_lock_id).with_for_update()
-    )
-    account_2 = res2.scalar_one_or_none()
+        txn, = await _insert_ledger_rows(db, [
+            _ledger_row(data.amount, TransactionType.withdrawal, EntryDirection.debit, data.description, data.account_id)
+        ])
+    return txn
 
-    # 4. Re-assign our locked rows back to the logical 'sender' and 'receiver'
-    if data.from_account_id == first_lock_id:
-        from_account = account_1
-        to_account = account_2
-    else:
-        from_account = account_2
-        to_account = account_1
+async def withdraw(db: AsyncSession, data: DepositWithdrawRequest, user_id: int):
+    txn = await apply_withdraw(db, data, user_id)
+    await db.commit()
+    return txn
+
+async def _raise_transfer_error(db: AsyncSession, data: TransferRequest, user_id: int):
+    # Cold path: re-runs the standard validations to report why the transfer was rejected. It only
+    # raises: the session's owner decides whether the rest of its transaction rolls back.
+    result = await db.execute(
+        select(Account.id, Account.owner_id, Account.balance)
+        .where(Account.id.in_([data.from_account_id, data.to_account_id]))
+    )
+    accounts = {row.id: row for row in result.all()}
+    from_account = accounts.get(data.from_account_id)
+    to_account = accounts.get(data.to_account_id)
 
-    # 5. Execute standard validations
     if not from_account:
         raise HTTPException(status_code=404, detail="Source account not found")
     if not to_account:
@@ -94,37 +138,208 @@ async def transfer(db: AsyncSession, data: TransferRequest, user_id: int):
         raise HTTPException(status_code=400, detail="Cannot transfer to same account")
     if data.amount <= 0:
         raise HTTPException(status_code=400, detail="Amount must be greater than 0")
-    if Decimal(str(from_account.balance)) < data.amount:
-        raise HTTPException(status_code=400, detail="Insufficient funds")
-
-    # 6. Perform the exact, precision math
-    from_account.balance = Decimal(str(from_account.balance)) - data.amount
-    to_account.balance = Decimal(str(to_account.balance)) + data.amount
-
-    # 7. Create the Double-Entry Ledger records
-    debit_txn = Transaction(
-        amount=data.amount,
-        transaction_type=TransactionType.transfer,
-        status=TransactionStatus.completed,
-        description=f"Transfer to account {to_account.account_number}",
-        account_id=from_account.id
+    raise HTTPException(status_code=400, detail="Insufficient funds")
+
+async def apply_transfer(db: AsyncSession, data: TransferRequest, user_id: int):
+    # Applies a transfer inside the caller's transaction without committing
+    if data.amount <= 0 or data.from_account_id == data.to_account_id:
+        await _raise_transfer_error(db, data, user_id)
+
+    # 1. Velocity limits of the source account and its owner, from in-memory windows
+    async with velocity_limits.reserve(db, data.from_account_id, user_id, TransactionType.transfer, data.amount):
+        # 2. Touch rows in ascending id order so concurrent transfers can never wait on each other in a cycle
+        debit_first = data.from_account_id < data.to_account_id
+
+        # 3. Conditional updates: the debit only applies to the caller's account while funds cover it
+        if debit_first:
+            from_account = await _adjust_balance(db, data.from_account_id, -data.amount, owner_id=user_id)
+            to_account = from_account and await _adjust_balance(db, data.to_account_id, data.amount)
+        else:
+            to_account = await _adjust_balance(db, data.to_account_id, data.amount)
+            from_account = to_account and await _adjust_balance(db, data.from_account_id, -data.amount, owner_id=user_id)
+
+        if not from_account or not to_account:
+            # undo only the half that applied, leaving the caller's earlier writes in place
+            if from_account:
+                await _adjust_balance(db, data.from_account_id, data.amount)
+            if to_account:
+                await _adjust_balance(db, data.to_account_id, -data.amount)
+            await _raise_transfer_error(db, data, user_id)
+
+        # 4. Create the Double-Entry Ledger records in one statement
+        debit_txn, credit_txn = await _insert_ledger_rows(db, [
+            _ledger_row(data.amount, TransactionType.transfer, EntryDirection.debit,
+                        transfer_description(f"Transfer to account {to_account.account_number}", data.description),
+                        from_account.id),
+            _ledger_row(data.amount, TransactionType.transfer, EntryDirection.credit,
+                        transfer_description(f"Transfer from account {from_account.account_number}", data.description),
+                        to_account.id),
+        ])
+    return debit_txn
+
+async def transfer(db: AsyncSession, data: TransferRequest, user_id: int):
+    # Commit both balance changes and both ledger rows atomically
+    debit_txn = await apply_transfer(db, data, user_id)
+    await db.commit()
+    return debit_txn
+
+class BatchItemError(Exception):
+    pass
+
+def _apply_batch_item(item, accounts: dict, balances: dict, user_id: int, holds: list):
+    # Validates one leg against the in-memory balances and returns the ledger rows it produces
+    is_transfer = item.operation == BatchOperation.transfer
+    account = accounts.get(item.account_id)
+    to_account = accounts.get(item.to_account_id) if is_transfer else None
+
+    if not account:
+        raise BatchItemError("Source account not found" if is_transfer else "Account not found")
+    if is_transfer and not to_account:
+        raise BatchItemError("Destination account not found")
+    if account.owner_id != user_id:
+        raise BatchItemError("Not your account")
+    if is_transfer and to_account.id == account.id:
+        raise BatchItemError("Cannot transfer to same account")
+    if item.amount <= 0:
+        raise BatchItemError("Amount must be greater than 0")
+    if item.operation != BatchOperation.deposit and balances[account.id] < item.amount:
+        raise BatchItemError("Insufficient funds")
+    if item.operation != BatchOperation.deposit:
+        operation = TransactionType.transfer if is_transfer else TransactionType.withdrawal
+        try:
+            holds.extend(velocity_limits.hold(account.id, account.owner_id, account.account_type, operation, item.amount))
+        except VelocityLimitExceeded as exc:
+            raise BatchItemError(str(exc))
+
+    if item.operation == BatchOperation.deposit:
+        balances[account.id] += item.amount
+        return [_ledger_row(item.amount, TransactionType.deposit, EntryDirection.credit, item.description, account.id)]
+
+    if item.operation == BatchOperation.withdraw:
+        balances[account.id] -= item.amount
+        return [_ledger_row(item.amount, TransactionType.withdrawal, EntryDirection.debit, item.description, account.id)]
+
+    balances[account.id] -= item.amount
+    balances[to_account.id] += item.amount
+    return [
+        _ledger_row(item.amount, TransactionType.transfer, EntryDirection.debit,
+                    transfer_description(f"Transfer to account {to_account.account_number}", item.description),
+                    account.id),
+        _ledger_row(item.amount, TransactionType.transfer, EntryDirection.credit,
+                    transfer_description(f"Transfer from account {account.account_number}", item.description),
+                    to_account.id),
+    ]
+
+def _items_account_ids(items) -> set:
+    account_ids = set()
+    for item in items:
+        account_ids.add(item.account_id)
+        if item.operation == BatchOperation.transfer and item.to_account_id is not None:
+            account_ids.add(item.to_account_id)
+    return account_ids
+
+def batch_account_ids(data: BatchRequest) -> set:
+    return _items_account_ids(data.items)
+
+async def batch_shard(data: BatchRequest) -> int:
+    # a batch commits once, so every account it touches must live on the same shard
+    shards = {await shard_directory.shard_for(account_id) for account_id in batch_account_ids(data)}
+    if len(shards) > 1:
+        raise HTTPException(status_code=400, detail="Batch touches accounts on different shards; use /transactions/transfer")
+    return shards.pop()
+
+async def apply_batch_items(db: AsyncSession, legs: list, atomic: bool):
+    # Applies (item, user_id) legs inside the caller's transaction without committing; each leg
+    # is validated for its own user. Returns one BatchItemResult per leg.
+    # 1. Lock every touched account in a single query, in ascending id order (same idea as transfer())
+    account_ids = _items_account_ids(item for item, _ in legs)
+
+    result = await db.execute(
+        select(Account.id, Account.owner_id, Account.balance, Account.account_number, Account.account_type)
+        .where(Account.id.in_(account_ids))
+        .order_by(Account.id)
+        .with_for_update()
     )
-    credit_txn = Transaction(
-        amount=data.amount,
-        transaction_type=TransactionType.transfer,
-        status=TransactionStatus.completed,
-        description=f"Transfer from account {from_account.account_number}",
-        account_id=to_account.id
+    accounts = {row.id: row for row in result.all()}
+    opening = {account_id: Decimal(str(row.balance)) for account_id, row in accounts.items()}
+    balances = dict(opening)
+
+    # 2. Apply every leg in memory, collecting ledger rows and per-item outcomes
+    results = []
+    applied = []
+    holds = []
+    for index, (item, user_id) in enumerate(legs):
+        try:
+            rows = _apply_batch_item(item, accounts, balances, user_id, holds)
+        except BatchItemError as exc:
+            results.append(BatchItemResult(index=index, success=False, error=str(exc)))
+            continue
+        results.append(BatchItemResult(index=index, success=True))
+        applied.append((index, rows))
+    # velocity holds of the applied legs follow the batch's commit or rollback
+    hold_until_commit(db, holds)
+
+    if atomic and len(applied) < len(legs):
+        await db.rollback()
+        for item_result in results:
+            if item_result.success:
+                item_result.success = False
+                item_result.error = "Not applied: batch rejected"
+        raise HTTPException(
+            status_code=400,
+            detail={
+                "message": "Batch rejected, no changes applied",
+                "results": [item_result.model_dump() for item_result in results],
+            }
+        )
+
+    # 3. Apply the net change per account as a guarded delta, so a concurrent writer's update
+    #    (SQLite ignores FOR UPDATE) is never overwritten and a debit can never overdraw
+    for account_id in sorted(balances):
+        delta = balances[account_id] - opening[account_id]
+        if delta and not await _adjust_balance(db, account_id, delta):
+            await db.rollback()
+            raise HTTPException(status_code=409, detail="Account balance changed concurrently, retry the batch")
+
+    # 4. Bulk-insert the ledger rows
+    ledger_rows = [row for _, rows in applied for row in rows]
+    inserted = await _insert_ledger_rows(db, ledger_rows) if ledger_rows else []
+    position = 0
+    for index, rows in applied:
+        results[index].transaction_id = inserted[position].id
+        position += len(rows)
+    return results
+
+async def batch(db: AsyncSession, data: BatchRequest, user_id: int):
+    results = await apply_batch_items(
+        db, [(item, user_id) for item in data.items], atomic=data.mode == BatchMode.atomic
     )
-    db.add(debit_txn)
-    db.add(credit_txn)
-    
-    # 8. Commit the transaction. This permanently saves the data AND releases the locks simultaneously!
     await db.commit()
-    await db.refresh(debit_txn)
-    
-    return debit_txn
-async def get_transaction_history(db: AsyncSession, account_id: int, user_id: int):
+
+    succeeded = sum(1 for item_result in results if item_result.success)
+    return BatchResponse(
+        mode=data.mode,
+        committed=True,
+        succeeded=succeeded,
+        failed=len(results) - succeeded,
+        results=results
+    )
+
+HISTORY_STREAM_CHUNK = 500
+
+def encode_cursor(txn) -> str:
+    # the row's (created_at, id) history key
+    created_at = txn.created_at.isoformat() if txn.created_at else ""
+    return base64.urlsafe_b64encode(f"{created_at}|{txn.id}".encode()).decode()
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, _, txn_id = base64.urlsafe_b64decode(cursor.encode()).decode().rpartition("|")
+        return (datetime.fromisoformat(created_at) if created_at else None), int(txn_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+async def get_owned_account(db: AsyncSession, account_id: int, user_id: int):
     acc_result = await db.execute(select(Account).where(Account.id == account_id))
     account = acc_result.scalar_one_or_none()
 
@@ -132,10 +347,82 @@ async def get_transaction_history(db: AsyncSession, account_id: int, user_id: in
         raise HTTPException(status_code=404, detail="Account not found")
     if account.owner_id != user_id:
         raise HTTPException(status_code=403, detail="Not your account")
+    return account
 
-    result = await db.execute(
-        select(Transaction)
-        .where(Transaction.account_id == account_id)
-        .order_by(Transaction.created_at.desc())
-    )
-    return result.scalars().all()
+def history_query(
+    account_id: int,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None,
+    tier=Transaction
+):
+    # plain column rows: responses are built from the tuples, no ORM instances
+    query = select(*tier.__table__.c).where(tier.account_id == account_id)
+    if from_date:
+        query = query.where(tier.created_at >= from_date)
+    if to_date:
+        query = query.where(tier.created_at <= to_date)
+    return query
+
+async def get_transaction_history(
+    db: AsyncSession,
+    account_id: int,
+    user_id: int,
+    limit: int = 50,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+):
+    await get_owned_account(db, account_id, user_id)
+
+    # Keyset pagination, newest first, on the (created_at, id) order the history index serves.
+    # Imported or rebalanced rows need not have ids in created_at order, so the cursor holds both.
+    before_key = decode_cursor(before) if before else None
+    after_key = decode_cursor(after) if after else None
+    forward = bool(after) and not before
+
+    def page_query(tier):
+        query = history_query(account_id, from_date, to_date, tier)
+        if before_key is not None:
+            query = query.where(keyset_filter(tier, *before_key, newer=False))
+        if after_key is not None:
+            query = query.where(keyset_filter(tier, *after_key, newer=True))
+        if forward:
+            # walk towards newer rows from the cursor, then flip back to newest-first
+            return query.order_by(tier.created_at.asc(), tier.id.asc())
+        return query.order_by(tier.created_at.desc(), tier.id.desc())
+
+    # fetch one extra row to know whether another page exists; the archive tier is only read
+    # when the hot table runs out of rows for this page
+    rows = await read_tiers(db, page_query, limit + 1, newest_first=not forward)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if forward:
+        rows.reverse()
+
+    # next_cursor pages towards older rows (?before=), prev_cursor towards newer ones (?after=)
+    next_cursor = prev_cursor = None
+    if rows:
+        if has_more or forward:
+            next_cursor = encode_cursor(rows[-1])
+        if (has_more and forward) or before:
+            prev_cursor = encode_cursor(rows[0])
+    return rows, next_cursor, prev_cursor
+
+async def stream_transaction_history(
+    account_id: int,
+    from_date: Optional[datetime] = None,
+    to_date: Optional[datetime] = None
+):
+    # Runs on its own session: the request-scoped one may already be closed while the body streams.
+    # Newest first: the hot tier, then the archive.
+    async with account_session(account_id, read=True) as session:
+        for tier in ledger_tiers(newest_first=True):
+            query = (
+                history_query(account_id, from_date, to_date, tier)
+                .order_by(tier.created_at.desc(), tier.id.desc())
+                .execution_options(yield_per=HISTORY_STREAM_CHUNK)
+            )
+            result = await session.stream(query)
+            async for row in result:
+                yield transaction_adapter.dump_json(transaction_adapter.validate_python(row, from_attributes=True)) + b"\n"
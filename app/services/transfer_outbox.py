@@ -0,0 +1,183 @@
+from decimal import Decimal
+from fastapi import HTTPException
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.database import ShardSessionLocal, SHARD_COUNT
+from app.models.account import Account
+from app.models.transaction import TransactionType, EntryDirection
+from app.models.transfer_outbox import TransferOutbox, TransferInbox, OutboxStatus
+from app.schemas.transaction import TransferRequest
+from app.services.idempotency import run_idempotent
+from app.services.shards import shard_directory
+from app.services.velocity import velocity_limits
+from app.services.transaction import (
+    _adjust_balance, _insert_ledger_rows, _ledger_row, apply_transfer, transfer, transfer_description
+)
+from typing import Optional
+import asyncio
+import logging
+import os
+
+OUTBOX_RELAY_INTERVAL_SECONDS = float(os.getenv("OUTBOX_RELAY_INTERVAL_SECONDS", "5"))
+OUTBOX_RELAY_BATCH = 100
+
+logger = logging.getLogger(__name__)
+
+async def _raise_outbound_error(db: AsyncSession, data: TransferRequest, user_id: int):
+    # Cold path: the debit's conditional UPDATE matched nothing, report why
+    result = await db.execute(select(Account.owner_id).where(Account.id == data.from_account_id))
+    owner_id = result.scalar_one_or_none()
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Source account not found")
+    if owner_id != user_id:
+        raise HTTPException(status_code=403, detail="Not your account")
+    raise HTTPException(status_code=400, detail="Insufficient funds")
+
+async def apply_outbound_transfer(db: AsyncSession, data: TransferRequest, user_id: int):
+    # Source half of a cross-shard transfer, inside the caller's transaction without committing:
+    # the debit, its ledger row and the outbox row commit together on the source shard
+    if data.amount <= 0:
+        raise HTTPException(status_code=400, detail="Amount must be greater than 0")
+
+    target_shard = await shard_directory.shard_for(data.to_account_id)
+    async with ShardSessionLocal[target_shard]() as target:
+        result = await target.execute(
+            select(Account.account_number).where(Account.id == data.to_account_id)
+        )
+        to_account_number = result.scalar_one_or_none()
+    if to_account_number is None:
+        raise HTTPException(status_code=404, detail="Destination account not found")
+
+    async with velocity_limits.reserve(db, data.from_account_id, user_id, TransactionType.transfer, data.amount):
+        from_account = await _adjust_balance(db, data.from_account_id, -data.amount, owner_id=user_id)
+        if not from_account:
+            await _raise_outbound_error(db, data, user_id)
+
+        debit_txn, = await _insert_ledger_rows(db, [
+            _ledger_row(data.amount, TransactionType.transfer, EntryDirection.debit,
+                        transfer_description(f"Transfer to account {to_account_number}", data.description),
+                        from_account.id),
+        ])
+        await db.execute(insert(TransferOutbox).values(
+            from_account_id=from_account.id,
+            from_account_number=from_account.account_number,
+            to_account_id=data.to_account_id,
+            amount=data.amount,
+            debit_transaction_id=debit_txn.id,
+            description=data.description,
+            status=OutboxStatus.pending
+        ))
+    return debit_txn
+
+async def _credit_destination(source_shard: int, outbox) -> OutboxStatus:
+    # Destination half; the inbox row commits with the credit, so a redelivery is a no-op
+    target_shard = await shard_directory.shard_for(outbox.to_account_id)
+    async with ShardSessionLocal[target_shard]() as target:
+        result = await target.execute(
+            select(TransferInbox.outbox_id)
+            .where(TransferInbox.source_shard == source_shard, TransferInbox.outbox_id == outbox.id)
+        )
+        if result.scalar_one_or_none() is not None:
+            return OutboxStatus.delivered
+
+        if not await _adjust_balance(target, outbox.to_account_id, Decimal(str(outbox.amount))):
+            return OutboxStatus.reversed
+        credit_txn, = await _insert_ledger_rows(target, [
+            _ledger_row(Decimal(str(outbox.amount)), TransactionType.transfer, EntryDirection.credit,
+                        transfer_description(f"Transfer from account {outbox.from_account_number}", outbox.description),
+                        outbox.to_account_id),
+        ])
+        await target.execute(insert(TransferInbox).values(
+            source_shard=source_shard, outbox_id=outbox.id, credit_transaction_id=credit_txn.id
+        ))
+        try:
+            await target.commit()
+        except IntegrityError:
+            # another worker delivered it first; our credit rolled back with the inbox row
+            await target.rollback()
+        return OutboxStatus.delivered
+
+async def _settle(source_shard: int, outbox, status: OutboxStatus):
+    async with ShardSessionLocal[source_shard]() as source:
+        result = await source.execute(
+            update(TransferOutbox)
+            .where(TransferOutbox.id == outbox.id, TransferOutbox.status == OutboxStatus.pending)
+            .values(status=status, attempts=TransferOutbox.attempts + 1)
+            .returning(TransferOutbox.id)
+        )
+        if result.first() and status == OutboxStatus.reversed:
+            # the destination is gone: give the money back on the source shard
+            amount = Decimal(str(outbox.amount))
+            await _adjust_balance(source, outbox.from_account_id, amount)
+            await _insert_ledger_rows(source, [
+                _ledger_row(amount, TransactionType.transfer, EntryDirection.credit,
+                            f"Reversal of transfer {outbox.debit_transaction_id}", outbox.from_account_id),
+            ])
+        await source.commit()
+
+async def deliver_pending(source_shard: int, limit: int = OUTBOX_RELAY_BATCH) -> int:
+    async with ShardSessionLocal[source_shard]() as source:
+        result = await source.execute(
+            select(TransferOutbox)
+            .where(TransferOutbox.status == OutboxStatus.pending)
+            .order_by(TransferOutbox.id)
+            .limit(limit)
+        )
+        pending = result.scalars().all()
+    for outbox in pending:
+        await _settle(source_shard, outbox, await _credit_destination(source_shard, outbox))
+    return len(pending)
+
+async def dispatch_transfer(data: TransferRequest, user_id: int, idempotency_key: Optional[str] = None):
+    # Same shard: the usual single-transaction transfer. Across shards: debit plus outbox row on
+    # the source, then the credit is delivered right away (or by the relay after a failure).
+    source_shard = await shard_directory.shard_for(data.from_account_id)
+    target_shard = await shard_directory.shard_for(data.to_account_id)
+    async with ShardSessionLocal[source_shard]() as db:
+        if source_shard == target_shard:
+            if idempotency_key:
+                return await run_idempotent(db, user_id, idempotency_key, "transfer", data, apply_transfer)
+            return await transfer(db, data, user_id)
+
+        if idempotency_key:
+            debit_txn = await run_idempotent(db, user_id, idempotency_key, "transfer", data, apply_outbound_transfer)
+        else:
+            debit_txn = await apply_outbound_transfer(db, data, user_id)
+            await db.commit()
+
+    try:
+        await deliver_pending(source_shard)
+    except Exception:
+        # the debit is committed; the relay finishes the credit
+        logger.exception("Cross-shard transfer delivery failed, left to the relay")
+    return debit_txn
+
+async def run_relay():
+    while True:
+        await asyncio.sleep(OUTBOX_RELAY_INTERVAL_SECONDS)
+        for shard in range(SHARD_COUNT):
+            try:
+                await deliver_pending(shard)
+            except Exception:
+                logger.exception("Transfer outbox relay failed on shard %d", shard)
+
+_relay_task = None
+
+def start_relay():
+    global _relay_task
+    if SHARD_COUNT == 1:
+        return
+    _relay_task = asyncio.create_task(run_relay())
+
+async def stop_relay():
+    global _relay_task
+    if not _relay_task:
+        return
+    _relay_task.cancel()
+    try:
+        await _relay_task
+    except asyncio.CancelledError:
+        pass
+    _relay_task = None
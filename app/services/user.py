@@ -2,14 +2,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.models.user import User
 from app.schemas.user import UserCreate
-from app.services.auth import hash_password
+from app.services.auth import hash_password_async
 
 async def get_user_by_email(db: AsyncSession, email: str):
     result = await db.execute(select(User).where(User.email == email))
     return result.scalar_one_or_none()
 
 async def create_user(db: AsyncSession, user_data: UserCreate):
-    hashed = hash_password(user_data.password)
+    hashed = await hash_password_async(user_data.password)
     new_user = User(
         full_name=user_data.full_name,
         email=user_data.email,
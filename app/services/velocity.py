@@ -0,0 +1,229 @@
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+from app.database import ShardSessionLocal
+from app.models.account import Account
+from app.models.transaction import TransactionType, TransactionStatus, signed_amount
+from app.services.archive import ledger_tiers
+import os
+import time
+
+# "<scope>.<operation>.<window>=<max count>/<max amount>", comma separated; scope is an account
+# type (per account) or "user" (all of a user's accounts); either max may be left empty.
+# e.g. "savings.transfer.24h=10/5000,savings.withdrawal.1h=/1000,user.transfer.24h=50/20000"
+VELOCITY_LIMITS = os.getenv("VELOCITY_LIMITS", "")
+VELOCITY_ACCOUNT_CACHE_SIZE = int(os.getenv("VELOCITY_ACCOUNT_CACHE_SIZE", "100000"))
+
+# each window is kept as this many time buckets, so a check never walks individual transactions
+WINDOW_SLOTS = 60
+WINDOW_UNITS = {"m": 60, "h": 3600, "d": 86400}
+LIMITED_OPERATIONS = (TransactionType.withdrawal, TransactionType.transfer)
+
+class VelocityLimitExceeded(Exception):
+    pass
+
+def _parse_rules(value: str) -> dict:
+    # (scope, operation) -> [(window label, seconds, max count, max amount)]
+    rules = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, limit = item.partition("=")
+        scope, operation, window = name.strip().split(".")
+        max_count, _, max_amount = limit.partition("/")
+        rules.setdefault((scope, TransactionType(operation)), []).append((
+            window,
+            int(window[:-1]) * WINDOW_UNITS[window[-1]],
+            int(max_count) if max_count else None,
+            Decimal(max_amount) if max_amount else None,
+        ))
+    return rules
+
+class SlidingWindow:
+    """Count and amount of the last `span` seconds, bucketed into span / WINDOW_SLOTS slots.
+
+    A bucket only expires once all of it is older than the window, so limits err on the strict side.
+    """
+
+    __slots__ = ("span", "width", "buckets", "count", "amount")
+
+    def __init__(self, span: int):
+        self.span = span
+        self.width = span / WINDOW_SLOTS
+        self.buckets = deque()
+        self.count = 0
+        self.amount = Decimal("0")
+
+    def totals(self, now: float):
+        horizon = now - self.span
+        while self.buckets and self.buckets[0][0] + self.width <= horizon:
+            _, count, amount = self.buckets.popleft()
+            self.count -= count
+            self.amount -= amount
+        return self.count, self.amount
+
+    def add(self, when: float, amount: Decimal):
+        start = when - when % self.width
+        if self.buckets and self.buckets[-1][0] >= start:
+            self.buckets[-1][1] += 1
+            self.buckets[-1][2] += amount
+        else:
+            self.buckets.append([start, 1, amount])
+        self.count += 1
+        self.amount += amount
+
+class VelocityLimits:
+    """Per-account and per-user withdrawal/transfer limits over sliding windows, kept in memory.
+
+    A passing check holds its amount until the session commits (then it counts in the windows)
+    or ends without committing (then it is released), so concurrent requests cannot both slip
+    under a limit. Windows are per process and rebuilt from the ledger at startup.
+    """
+
+    def __init__(self, rules: dict, cache_size: int):
+        self.rules = rules
+        self.cache_size = cache_size
+        self.rejected = {}
+        self._accounts = OrderedDict()
+        self._windows = {}
+        self._held = {}
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.rules)
+
+    def _remember(self, account_id: int, owner_id: int, account_type):
+        self._accounts[account_id] = (owner_id, account_type)
+        self._accounts.move_to_end(account_id)
+        while len(self._accounts) > self.cache_size:
+            self._accounts.popitem(last=False)
+
+    async def _account(self, db: AsyncSession, account_id: int):
+        account = self._accounts.get(account_id)
+        if account is None:
+            result = await db.execute(
+                select(Account.owner_id, Account.account_type).where(Account.id == account_id)
+            )
+            row = result.first()
+            if row is None:
+                return None
+            account = (row.owner_id, row.account_type)
+        self._remember(account_id, *account)
+        return account
+
+    def _limits(self, account_id: int, owner_id: int, account_type, operation: TransactionType):
+        for scope, subject, key_id in ((account_type.value, "account", account_id), ("user", "user", owner_id)):
+            for window, span, max_count, max_amount in self.rules.get((scope, operation), ()):
+                yield (subject, key_id, operation, span), window, subject, max_count, max_amount
+
+    def hold(self, account_id: int, owner_id: int, account_type, operation: TransactionType, amount: Decimal) -> list:
+        if operation not in LIMITED_OPERATIONS:
+            return []
+        now = time.time()
+        keys = []
+        for key, window, subject, max_count, max_amount in self._limits(account_id, owner_id, account_type, operation):
+            window_state = self._windows.get(key)
+            count, total = window_state.totals(now) if window_state else (0, Decimal("0"))
+            held_count, held_amount = self._held.get(key, (0, Decimal("0")))
+            if max_count is not None and count + held_count + 1 > max_count:
+                self.rejected[operation.value] = self.rejected.get(operation.value, 0) + 1
+                raise VelocityLimitExceeded(f"Limit of {max_count} {operation.value}s per {window} reached for this {subject}")
+            if max_amount is not None and total + held_amount + amount > max_amount:
+                self.rejected[operation.value] = self.rejected.get(operation.value, 0) + 1
+                raise VelocityLimitExceeded(f"Limit of {max_amount} in {operation.value}s per {window} reached for this {subject}")
+            keys.append(key)
+        for key in keys:
+            held_count, held_amount = self._held.get(key, (0, Decimal("0")))
+            self._held[key] = (held_count + 1, held_amount + amount)
+        return [(key, amount) for key in keys]
+
+    def release(self, holds: list):
+        for key, amount in holds:
+            held_count, held_amount = self._held[key]
+            if held_count == 1:
+                del self._held[key]
+            else:
+                self._held[key] = (held_count - 1, held_amount - amount)
+
+    def confirm(self, holds: list):
+        self.release(holds)
+        now = time.time()
+        for key, amount in holds:
+            window = self._windows.get(key)
+            if window is None:
+                window = self._windows[key] = SlidingWindow(key[3])
+            window.add(now, amount)
+
+    @asynccontextmanager
+    async def reserve(self, db: AsyncSession, account_id: int, user_id: int, operation: TransactionType, amount: Decimal):
+        # wraps the balance update and ledger insert; the hold follows the session's commit
+        account = await self._account(db, account_id) if self.enabled else None
+        if account is None or account[0] != user_id:
+            # unknown or foreign account: the guarded UPDATE reports 404/403 as usual
+            yield
+            return
+        try:
+            holds = self.hold(account_id, account[0], account[1], operation, amount)
+        except VelocityLimitExceeded as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        try:
+            yield
+        except BaseException:
+            self.release(holds)
+            raise
+        hold_until_commit(db, holds)
+
+    async def rebuild(self):
+        # the debits of the longest window, from every shard's ledger (both tiers)
+        if not self.enabled:
+            return
+        since = datetime.utcnow() - timedelta(seconds=max(rule[1] for rules in self.rules.values() for rule in rules))
+        rows = []
+        for session_factory in ShardSessionLocal:
+            async with session_factory() as session:
+                for tier in ledger_tiers():
+                    result = await session.execute(
+                        select(tier.account_id, tier.transaction_type, tier.amount, tier.created_at,
+                               Account.owner_id, Account.account_type)
+                        .join(Account, Account.id == tier.account_id)
+                        .where(
+                            tier.created_at >= since,
+                            tier.status == TransactionStatus.completed,
+                            tier.transaction_type.in_(LIMITED_OPERATIONS),
+                            signed_amount(tier) < 0
+                        )
+                    )
+                    rows.extend(result.all())
+
+        self._windows.clear()
+        for row in sorted(rows, key=lambda row: row.created_at):
+            when = row.created_at.replace(tzinfo=timezone.utc).timestamp()
+            for key, *_ in self._limits(row.account_id, row.owner_id, row.account_type, row.transaction_type):
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = SlidingWindow(key[3])
+                window.add(when, Decimal(str(row.amount)))
+
+velocity_limits = VelocityLimits(_parse_rules(VELOCITY_LIMITS), VELOCITY_ACCOUNT_CACHE_SIZE)
+
+def hold_until_commit(db, holds: list):
+    if holds:
+        db.info.setdefault("velocity_holds", []).extend(holds)
+
+@event.listens_for(Session, "after_commit")
+def _confirm_holds(session):
+    holds = session.info.pop("velocity_holds", None)
+    if holds:
+        velocity_limits.confirm(holds)
+
+@event.listens_for(Session, "after_transaction_end")
+def _release_holds(session, transaction):
+    # rolled back, or closed without committing
+    if transaction.parent is None:
+        holds = session.info.pop("velocity_holds", None)
+        if holds:
+            velocity_limits.release(holds)
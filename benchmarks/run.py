@@ -0,0 +1,344 @@
+"""In-process load tests for the API hot paths.
+
+Drives the FastAPI app over ASGI (no network, no server) against a throwaway
+SQLite database and writes a JSON report so runs can be diffed:
+
+    python -m benchmarks.run --output bench_results.json
+    python -m benchmarks.run --scenario deposits --requests 2000 --concurrency 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlencode
+
+SCENARIOS = ("deposits", "hot_account", "history", "login_storm")
+
+def configure_environment(args):
+    # must run before the app (and app.database) is imported
+    workdir = tempfile.mkdtemp(prefix="bank-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{workdir}/bench.sqlite3"
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+    os.environ.setdefault("ALGORITHM", "HS256")
+    os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+    return workdir
+
+class ASGIClient:
+    """Minimal ASGI HTTP client: enough for JSON and form requests against one app."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def request(self, method: str, path: str, **kwargs):
+        status, _, payload = await self.exchange(method, path, **kwargs)
+        return status, payload
+
+    async def exchange(self, method: str, path: str, json_body=None, form=None, headers=None, params=None):
+        # (status, response headers with lower-cased names, body)
+        body = b""
+        request_headers = [(b"host", b"bench")]
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            request_headers.append((b"content-type", b"application/json"))
+        elif form is not None:
+            body = urlencode(form).encode()
+            request_headers.append((b"content-type", b"application/x-www-form-urlencoded"))
+        for key, value in (headers or {}).items():
+            request_headers.append((key.lower().encode(), value.encode()))
+        request_headers.append((b"content-length", str(len(body)).encode()))
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}).encode(),
+            "headers": request_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        sent = False
+        status = None
+        response_headers = {}
+        chunks = []
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.sleep(3600)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_headers.update((key.decode().lower(), value.decode()) for key, value in message.get("headers", ()))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        payload = b"".join(chunks)
+        return status, response_headers, payload
+
+    async def json(self, method: str, path: str, **kwargs):
+        status, payload = await self.request(method, path, **kwargs)
+        return status, json.loads(payload) if payload else None
+
+class StatementCounter:
+    """Counts SQL statements on the app's engines via SQLAlchemy cursor events."""
+
+    def __init__(self, engines):
+        self.count = 0
+        from sqlalchemy import event
+        for engine in {id(e): e for e in engines}.values():
+            event.listen(engine.sync_engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args):
+        self.count += 1
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+async def run_load(name: str, make_request, total: int, concurrency: int, counter: StatementCounter):
+    # make_request(i) -> awaitable returning an HTTP status
+    latencies = []
+    statuses = {}
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            started = time.perf_counter()
+            status = await make_request(index)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+
+    statements_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    statements = counter.count - statements_before
+
+    latencies.sort()
+    result = {
+        "scenario": name,
+        "requests": total,
+        "concurrency": concurrency,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3),
+            "p95": round(percentile(latencies, 0.95) * 1000, 3),
+            "p99": round(percentile(latencies, 0.99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        },
+        "statements_per_request": round(statements / total, 2) if total else 0.0,
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+    }
+    print(
+        f"{name:<12} {result['throughput_rps']:>9.1f} req/s  "
+        f"p50 {result['latency_ms']['p50']:>8.2f}ms  p95 {result['latency_ms']['p95']:>8.2f}ms  "
+        f"p99 {result['latency_ms']['p99']:>8.2f}ms  {result['statements_per_request']:>5.1f} stmts/req  "
+        f"{result['status_codes']}",
+        file=sys.stderr
+    )
+    return result
+
+async def register_and_login(client: ASGIClient, email: str, password: str = "bench-password"):
+    await client.json("POST", "/auth/register", json_body={"full_name": "Bench User", "email": email, "password": password})
+    status, body = await client.json("POST", "/auth/login", form={"username": email, "password": password})
+    if status != 200:
+        raise RuntimeError(f"login failed for {email}: {status} {body}")
+    return {"Authorization": f"Bearer {body['access_token']}"}
+
+async def open_account(client: ASGIClient, headers: dict) -> int:
+    status, body = await client.json("POST", "/accounts/", json_body={}, headers=headers)
+    if status != 201:
+        raise RuntimeError(f"account creation failed: {status} {body}")
+    return body["id"]
+
+async def scenario_deposits(client, counter, args):
+    # every worker owns its own account: no row contention
+    users = []
+    for index in range(args.concurrency):
+        headers = await register_and_login(client, f"deposit-{index}@example.com")
+        users.append((headers, await open_account(client, headers)))
+
+    async def make_request(index):
+        headers, account_id = users[index % len(users)]
+        status, _ = await client.request(
+            "POST", "/transactions/deposit",
+            json_body={"account_id": account_id, "amount": "1.00"}, headers=headers
+        )
+        return status
+
+    return await run_load("deposits", make_request, args.requests, args.concurrency, counter)
+
+async def scenario_hot_account(client, counter, args):
+    # many senders transfer into the same destination account
+    target_headers = await register_and_login(client, "hot-target@example.com")
+    target_id = await open_account(client, target_headers)
+    senders = []
+    for index in range(args.concurrency):
+        headers = await register_and_login(client, f"hot-sender-{index}@example.com")
+        account_id = await open_account(client, headers)
+        await client.request(
+            "POST", "/transactions/deposit",
+            json_body={"account_id": account_id, "amount": "1000000.00"}, headers=headers
+        )
+        senders.append((headers, account_id))
+
+    async def make_request(index):
+        headers, account_id = senders[index % len(senders)]
+        status, _ = await client.request(
+            "POST", "/transactions/transfer",
+            json_body={"from_account_id": account_id, "to_account_id": target_id, "amount": "1.00"},
+            headers=headers
+        )
+        return status
+
+    return await run_load("hot_account", make_request, args.requests, args.concurrency, counter)
+
+async def history_cursors(client, headers, account_id: int, page_size: int, depth: int) -> list:
+    # the cursor of every page, walked once from the newest row; None stands for the first page
+    cursors = [None]
+    for _ in range(depth // page_size + 1):
+        params = {"limit": page_size, **({"before": cursors[-1]} if cursors[-1] else {})}
+        status, response_headers, body = await client.exchange(
+            "GET", f"/transactions/history/{account_id}", headers=headers, params=params
+        )
+        if status != 200:
+            raise RuntimeError(f"history walk failed: {status} {body}")
+        cursor = response_headers.get("x-next-cursor")
+        if not cursor:
+            return cursors
+        cursors.append(cursor)
+    raise RuntimeError("history cursor did not reach the oldest page")
+
+async def scenario_history(client, counter, args):
+    # one account with a deep ledger, read page by page at every depth of it
+    headers = await register_and_login(client, "history@example.com")
+    account_id = await open_account(client, headers)
+    remaining = args.history_depth
+    while remaining:
+        size = min(remaining, 5000)
+        status, body = await client.json(
+            "POST", "/transactions/batch",
+            json_body={"items": [{"operation": "deposit", "account_id": account_id, "amount": "1.00"}] * size},
+            headers=headers
+        )
+        if status != 200:
+            raise RuntimeError(f"history seeding failed: {status} {body}")
+        remaining -= size
+
+    # requests cycle through cursors taken at every page, so deep keyset seeks are measured too
+    cursors = await history_cursors(client, headers, account_id, args.page_size, args.history_depth)
+
+    async def make_request(index):
+        cursor = cursors[index % len(cursors)]
+        params = {"limit": args.page_size, **({"before": cursor} if cursor else {})}
+        status, _ = await client.request(
+            "GET", f"/transactions/history/{account_id}", headers=headers, params=params
+        )
+        return status
+
+    return await run_load("history", make_request, args.requests, args.concurrency, counter)
+
+async def scenario_login_storm(client, counter, args):
+    emails = [f"login-{index}@example.com" for index in range(args.concurrency)]
+    for email in emails:
+        await register_and_login(client, email)
+
+    async def make_request(index):
+        status, _ = await client.request(
+            "POST", "/auth/login", form={"username": emails[index % len(emails)], "password": "bench-password"}
+        )
+        return status
+
+    return await run_load("login_storm", make_request, args.requests, args.concurrency, counter)
+
+RUNNERS = {
+    "deposits": scenario_deposits,
+    "hot_account": scenario_hot_account,
+    "history": scenario_history,
+    "login_storm": scenario_login_storm,
+}
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def main_async(args):
+    workdir = configure_environment(args)
+    from app.main import app
+    from app.database import engine, read_engine
+
+    counter = StatementCounter([engine, read_engine])
+    client = ASGIClient(app)
+    await app.router.startup()
+    results = []
+    try:
+        for name in args.scenario or SCENARIOS:
+            results.append(await RUNNERS[name](client, counter, args))
+    finally:
+        await app.router.shutdown()
+        await engine.dispose()
+        await read_engine.dispose()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "database": os.environ["DATABASE_URL"],
+        "settings": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "history_depth": args.history_depth,
+            "page_size": args.page_size,
+            "bcrypt_rounds": args.bcrypt_rounds,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as handle:
+        json.dump(report, handle, indent=2)
+    print(f"Wrote {args.output} (database in {workdir})", file=sys.stderr)
+    return report
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="In-process API benchmarks")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="repeatable; default runs all")
+    parser.add_argument("--requests", type=int, default=1000, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent in-flight requests")
+    parser.add_argument("--history-depth", type=int, default=20000, help="ledger rows seeded for the history scenario")
+    parser.add_argument("--page-size", type=int, default=50, help="history page size")
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", "12")))
+    parser.add_argument("--output", default="bench_results.json", help="machine-readable report path")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    asyncio.run(main_async(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+from decimal import Decimal
+import os
+import tempfile
+import uuid
+
+# the app reads its configuration at import time, so the test databases are set up first
+_db_dir = tempfile.mkdtemp(prefix="bank-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/primary.sqlite3"
+os.environ["SHARD_DATABASE_URLS"] = f"sqlite+aiosqlite:///{_db_dir}/shard1.sqlite3"
+os.environ["READ_DATABASE_URL"] = ""
+os.environ["SECRET_KEY"] = "test-secret"
+os.environ["ALGORITHM"] = "HS256"
+os.environ["ACCESS_TOKEN_EXPIRE_MINUTES"] = "30"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import httpx
+import pytest
+from app.main import app
+from app.services.shards import place_account
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="session")
+async def client(anyio_backend):
+    await app.router.startup()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+    await app.router.shutdown()
+
+@pytest.fixture
+async def auth_headers(client):
+    # a fresh user per test keeps tests independent on the shared databases
+    email = f"{uuid.uuid4().hex}@example.com"
+    response = await client.post(
+        "/auth/register", json={"full_name": "Test User", "email": email, "password": "secret"}
+    )
+    assert response.status_code == 201, response.text
+    response = await client.post("/auth/login", data={"username": email, "password": "secret"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+@pytest.fixture
+def open_account(client, auth_headers):
+    # shard: keep opening until an account is placed there (ids alternate between the two shards)
+    async def open_account(deposit: str = None, shard: int = None) -> int:
+        while True:
+            response = await client.post("/accounts/", json={}, headers=auth_headers)
+            assert response.status_code == 201, response.text
+            account_id = response.json()["id"]
+            if shard is None or place_account(account_id) == shard:
+                break
+        if deposit:
+            response = await client.post(
+                "/transactions/deposit", json={"account_id": account_id, "amount": deposit}, headers=auth_headers
+            )
+            assert response.status_code == 200, response.text
+        return account_id
+    return open_account
+
+@pytest.fixture
+def balance_of(client, auth_headers):
+    async def balance_of(account_id: int) -> Decimal:
+        response = await client.get("/accounts/me", headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return next(Decimal(account["balance"]) for account in response.json() if account["id"] == account_id)
+    return balance_of
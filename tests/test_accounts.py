@@ -0,0 +1,39 @@
+import pytest
+from app.database import ShardSessionLocal
+from app.models.account import Account
+from app.services.account import format_account_number, luhn_check_digit, sequence_value_of
+
+pytestmark = pytest.mark.anyio
+
+async def _open(client, headers):
+    response = await client.post("/accounts/", json={}, headers=headers)
+    assert response.status_code == 201, response.text
+    return response.json()
+
+async def test_sequence_numbers_have_their_own_format(client, auth_headers):
+    number = (await _open(client, auth_headers))["account_number"]
+
+    assert len(number) == 14 and number.startswith("10")
+    assert luhn_check_digit(number[:-1]) == number[-1]
+    # the 12-digit numbers drawn at random before the sequence are never in its format
+    assert sequence_value_of("123456789012") is None
+
+async def test_number_taken_by_an_import_is_skipped(client, auth_headers):
+    # an import wrote the next number of this worker's block on every shard
+    value = sequence_value_of((await _open(client, auth_headers))["account_number"])
+    taken = format_account_number(value + 1)
+    for shard, session_factory in enumerate(ShardSessionLocal):
+        async with session_factory() as session:
+            session.add(Account(id=900_000 + shard, account_number=taken, balance=0, owner_id=0))
+            await session.commit()
+
+    account = await _open(client, auth_headers)
+
+    assert account["account_number"] != taken
+    assert sequence_value_of(account["account_number"]) > value + 1
+
+async def test_bulk_numbers_are_distinct(client, auth_headers):
+    response = await client.post("/accounts/bulk", json={"count": 25}, headers=auth_headers)
+    assert response.status_code == 201, response.text
+    numbers = [account["account_number"] for account in response.json()]
+    assert len(set(numbers)) == 25
@@ -0,0 +1,54 @@
+from decimal import Decimal
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def _batch(client, headers, mode, items):
+    return await client.post("/transactions/batch", json={"mode": mode, "items": items}, headers=headers)
+
+async def test_atomic_batch_applies_nothing_when_one_item_fails(client, auth_headers, open_account, balance_of):
+    # a batch commits once, so its accounts share a shard
+    source = await open_account("100.00", shard=0)
+    target = await open_account(shard=0)
+
+    response = await _batch(client, auth_headers, "atomic", [
+        {"operation": "transfer", "account_id": source, "to_account_id": target, "amount": "30.00"},
+        {"operation": "withdraw", "account_id": source, "amount": "500.00"},
+    ])
+
+    assert response.status_code == 400
+    results = response.json()["detail"]["results"]
+    assert [result["success"] for result in results] == [False, False]
+    assert results[1]["error"] == "Insufficient funds"
+    assert await balance_of(source) == Decimal("100.00")
+    assert await balance_of(target) == Decimal("0.00")
+
+async def test_best_effort_batch_commits_the_items_that_pass(client, auth_headers, open_account, balance_of):
+    source = await open_account("100.00", shard=0)
+    target = await open_account(shard=0)
+
+    response = await _batch(client, auth_headers, "best_effort", [
+        {"operation": "transfer", "account_id": source, "to_account_id": target, "amount": "30.00"},
+        {"operation": "withdraw", "account_id": source, "amount": "500.00"},
+        {"operation": "deposit", "account_id": target, "amount": "5.00"},
+    ])
+
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    assert [result["success"] for result in body["results"]] == [True, False, True]
+    assert all(result["transaction_id"] for result in body["results"] if result["success"])
+    assert await balance_of(source) == Decimal("70.00")
+    assert await balance_of(target) == Decimal("35.00")
+
+async def test_batch_legs_are_checked_against_running_balances(client, auth_headers, open_account, balance_of):
+    # each withdrawal alone is covered, together they are not
+    account_id = await open_account("50.00", shard=0)
+
+    response = await _batch(client, auth_headers, "best_effort", [
+        {"operation": "withdraw", "account_id": account_id, "amount": "30.00"},
+        {"operation": "withdraw", "account_id": account_id, "amount": "30.00"},
+    ])
+
+    assert [result["success"] for result in response.json()["results"]] == [True, False]
+    assert await balance_of(account_id) == Decimal("20.00")
@@ -0,0 +1,54 @@
+from decimal import Decimal
+import asyncio
+import pytest
+from app.services.group_commit import group_committer
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+async def group_commit():
+    group_committer.start()
+    yield group_committer
+    await group_committer.stop()
+
+async def _move(client, headers, operation, account_id, amount="1.00"):
+    return await client.post(
+        f"/transactions/{operation}", json={"account_id": account_id, "amount": amount}, headers=headers
+    )
+
+async def test_concurrent_writes_share_commits_and_all_land(
+    client, auth_headers, open_account, balance_of, group_commit
+):
+    busy = await open_account("10.00")
+    draining = await open_account("10.00")
+    flushes_before = group_commit.batch_sizes.count
+
+    # 15 withdrawals of 1.00 against 10.00: exactly 10 can pass, in whatever order they land
+    requests = (
+        [_move(client, auth_headers, "deposit", busy) for _ in range(40)]
+        + [_move(client, auth_headers, "withdraw", busy) for _ in range(20)]
+        + [_move(client, auth_headers, "withdraw", draining) for _ in range(15)]
+    )
+    responses = await asyncio.gather(*requests)
+
+    busy_responses, draining_responses = responses[:60], responses[60:]
+    assert all(response.status_code == 200 for response in busy_responses)
+    assert sorted(response.status_code for response in draining_responses) == [200] * 10 + [400] * 5
+    ids = [response.json()["id"] for response in responses if response.status_code == 200]
+    assert len(set(ids)) == len(ids)
+    assert await balance_of(busy) == Decimal("30.00")
+    assert await balance_of(draining) == Decimal("0.00")
+    # jobs were combined: fewer shared commits than requests
+    assert group_commit.batch_sizes.count - flushes_before < len(requests)
+
+async def test_rejected_job_does_not_spoil_its_batch(client, auth_headers, open_account, balance_of, group_commit):
+    account_id = await open_account("5.00")
+
+    rejected, accepted = await asyncio.gather(
+        _move(client, auth_headers, "withdraw", account_id, "50.00"),
+        _move(client, auth_headers, "deposit", account_id, "2.00"),
+    )
+
+    assert rejected.status_code == 400
+    assert accepted.status_code == 200
+    assert await balance_of(account_id) == Decimal("7.00")
@@ -0,0 +1,58 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def _deposit_many(client, headers, account_id, count):
+    ids = []
+    for _ in range(count):
+        response = await client.post(
+            "/transactions/deposit", json={"account_id": account_id, "amount": "1.00"}, headers=headers
+        )
+        assert response.status_code == 200, response.text
+        ids.append(response.json()["id"])
+    return ids
+
+async def _walk(client, headers, account_id, direction, cursor=None, limit=7):
+    # follows the cursors page by page; the page cap turns a cursor that repeats into a failure
+    header = "x-next-cursor" if direction == "before" else "x-prev-cursor"
+    pages = []
+    for _ in range(50):
+        params = {"limit": limit, **({direction: cursor} if cursor else {})}
+        response = await client.get(f"/transactions/history/{account_id}", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+        pages.append([txn["id"] for txn in response.json()])
+        cursor = response.headers.get(header)
+        if not cursor:
+            return pages
+    pytest.fail("history cursor did not advance")
+
+async def test_cursor_pages_through_rows_sharing_one_second(client, auth_headers, open_account):
+    # deposits made back to back share a created_at second; the cursor must still move past them
+    account_id = await open_account()
+    ids = await _deposit_many(client, auth_headers, account_id, 30)
+
+    pages = await _walk(client, auth_headers, account_id, "before")
+
+    seen = [txn_id for page in pages for txn_id in page]
+    assert seen == sorted(ids, reverse=True)
+    assert [len(page) for page in pages] == [7, 7, 7, 7, 2]
+
+async def test_prev_cursor_walks_back_to_the_newest_page(client, auth_headers, open_account):
+    account_id = await open_account()
+    ids = await _deposit_many(client, auth_headers, account_id, 15)
+
+    response = await client.get(f"/transactions/history/{account_id}", params={"limit": 5}, headers=auth_headers)
+    cursor = response.headers["x-next-cursor"]
+    response = await client.get(
+        f"/transactions/history/{account_id}", params={"limit": 5, "before": cursor}, headers=auth_headers
+    )
+    pages = await _walk(client, auth_headers, account_id, "after", response.headers["x-prev-cursor"], limit=5)
+
+    assert pages == [sorted(ids, reverse=True)[:5]]
+
+async def test_invalid_cursor_is_rejected(client, auth_headers, open_account):
+    account_id = await open_account()
+    response = await client.get(
+        f"/transactions/history/{account_id}", params={"before": "not a cursor"}, headers=auth_headers
+    )
+    assert response.status_code == 400
@@ -0,0 +1,46 @@
+from decimal import Decimal
+import uuid
+import pytest
+from app.services.idempotency import replay_cache
+
+pytestmark = pytest.mark.anyio
+
+async def _deposit(client, headers, account_id, amount, key):
+    return await client.post(
+        "/transactions/deposit",
+        json={"account_id": account_id, "amount": amount},
+        headers={**headers, "Idempotency-Key": key}
+    )
+
+async def test_retry_replays_the_first_response(client, auth_headers, open_account, balance_of):
+    account_id = await open_account()
+    key = uuid.uuid4().hex
+
+    first = await _deposit(client, auth_headers, account_id, "25.00", key)
+    retry = await _deposit(client, auth_headers, account_id, "25.00", key)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert await balance_of(account_id) == Decimal("25.00")
+
+async def test_key_reused_for_another_request_is_rejected(client, auth_headers, open_account, balance_of):
+    account_id = await open_account()
+    key = uuid.uuid4().hex
+
+    await _deposit(client, auth_headers, account_id, "25.00", key)
+    mismatch = await _deposit(client, auth_headers, account_id, "99.00", key)
+
+    assert mismatch.status_code == 422
+    assert await balance_of(account_id) == Decimal("25.00")
+
+async def test_replay_without_the_cache_reads_the_stored_key(client, auth_headers, open_account, balance_of, monkeypatch):
+    # with the in-process cache off, the idempotency_keys row answers the retry
+    monkeypatch.setattr(replay_cache, "maxsize", 0)
+    account_id = await open_account()
+    key = uuid.uuid4().hex
+    first = await _deposit(client, auth_headers, account_id, "25.00", key)
+
+    retry = await _deposit(client, auth_headers, account_id, "25.00", key)
+
+    assert retry.json()["id"] == first.json()["id"]
+    assert await balance_of(account_id) == Decimal("25.00")
@@ -0,0 +1,28 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+async def test_metrics_are_open_to_scrapers(client):
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_requests_total" in response.text
+
+async def test_slow_requests_need_a_token(client, auth_headers):
+    assert (await client.get("/metrics/slow-requests")).status_code == 401
+    assert (await client.get("/metrics/slow-requests", headers=auth_headers)).status_code == 200
+
+async def test_principal_cache_counters_are_in_metrics(client, auth_headers):
+    await client.get("/auth/me", headers=auth_headers)
+
+    response = await client.get("/metrics")
+
+    assert "principal_cache_hits_total" in response.text
+    assert "principal_cache_max_size" in response.text
+    assert (await client.get("/auth/cache/stats", headers=auth_headers)).status_code == 404
+
+async def test_group_commit_histograms_are_in_metrics(client, auth_headers):
+    response = await client.get("/metrics")
+
+    assert "group_commit_batch_size_bucket" in response.text
+    assert "group_commit_running 0" in response.text
+    assert (await client.get("/transactions/group-commit/stats", headers=auth_headers)).status_code == 404
@@ -0,0 +1,65 @@
+from decimal import Decimal
+import pytest
+from sqlalchemy import update
+from sqlalchemy.future import select
+from app.database import ShardSessionLocal
+from app.models.transfer_outbox import TransferOutbox, OutboxStatus
+from app.services.transfer_outbox import deliver_pending
+
+pytestmark = pytest.mark.anyio
+
+async def _outbox_row(debit_transaction_id):
+    async with ShardSessionLocal[0]() as session:
+        result = await session.execute(
+            select(TransferOutbox).where(TransferOutbox.debit_transaction_id == debit_transaction_id)
+        )
+        return result.scalar_one()
+
+async def _transfer(client, headers, source, target, amount):
+    return await client.post(
+        "/transactions/transfer",
+        json={"from_account_id": source, "to_account_id": target, "amount": amount},
+        headers=headers
+    )
+
+async def test_cross_shard_transfer_is_delivered(client, auth_headers, open_account, balance_of):
+    source = await open_account("100.00", shard=0)
+    target = await open_account(shard=1)
+
+    response = await _transfer(client, auth_headers, source, target, "40.00")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["account_id"] == source
+    assert (await _outbox_row(response.json()["id"])).status == OutboxStatus.delivered
+    assert await balance_of(source) == Decimal("60.00")
+    assert await balance_of(target) == Decimal("40.00")
+    history = await client.get(f"/transactions/history/{target}", headers=auth_headers)
+    assert [(txn["direction"], txn["amount"]) for txn in history.json()] == [("credit", "40.00")]
+
+async def test_redelivery_does_not_credit_twice(client, auth_headers, open_account, balance_of):
+    source = await open_account("100.00", shard=0)
+    target = await open_account(shard=1)
+    response = await _transfer(client, auth_headers, source, target, "40.00")
+
+    # as if the relay crashed after the credit committed but before the outbox row was settled
+    async with ShardSessionLocal[0]() as session:
+        await session.execute(
+            update(TransferOutbox)
+            .where(TransferOutbox.debit_transaction_id == response.json()["id"])
+            .values(status=OutboxStatus.pending)
+        )
+        await session.commit()
+    await deliver_pending(0)
+
+    assert (await _outbox_row(response.json()["id"])).status == OutboxStatus.delivered
+    assert await balance_of(target) == Decimal("40.00")
+
+async def test_cross_shard_transfer_without_funds_moves_nothing(client, auth_headers, open_account, balance_of):
+    source = await open_account("10.00", shard=0)
+    target = await open_account(shard=1)
+
+    response = await _transfer(client, auth_headers, source, target, "40.00")
+
+    assert response.status_code == 400
+    assert await balance_of(source) == Decimal("10.00")
+    assert await balance_of(target) == Decimal("0.00")
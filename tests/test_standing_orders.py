@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+import pytest
+from app.services.standing_order import run_due_orders
+
+pytestmark = pytest.mark.anyio
+
+async def _order(client, headers, source, target, description):
+    response = await client.post(
+        f"/accounts/{source}/standing-orders/",
+        json={"to_account_id": target, "amount": "15.00", "frequency": "monthly", "description": description},
+        headers=headers
+    )
+    assert response.status_code == 201, response.text
+    return response.json()
+
+async def _descriptions(client, headers, account_id):
+    response = await client.get(f"/transactions/history/{account_id}", headers=headers)
+    return [(txn["direction"], txn["description"]) for txn in response.json() if txn["transaction_type"] == "transfer"]
+
+@pytest.mark.parametrize("target_shard", [0, 1], ids=["same-shard", "cross-shard"])
+async def test_order_description_reaches_both_ledger_rows(
+    client, auth_headers, open_account, balance_of, target_shard
+):
+    source = await open_account("100.00", shard=0)
+    target = await open_account(shard=target_shard)
+    await _order(client, auth_headers, source, target, "rent")
+
+    await run_due_orders(0, now=datetime.utcnow() + timedelta(minutes=1))
+
+    assert await balance_of(source) == Decimal("85.00")
+    assert await balance_of(target) == Decimal("15.00")
+    [(direction, debit)] = await _descriptions(client, auth_headers, source)
+    [(_, credit)] = await _descriptions(client, auth_headers, target)
+    assert direction == "debit"
+    assert debit.startswith("Transfer to account ") and debit.endswith(": rent")
+    assert credit.startswith("Transfer from account ") and credit.endswith(": rent")
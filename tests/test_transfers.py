@@ -0,0 +1,39 @@
+from decimal import Decimal
+import pytest
+from fastapi import HTTPException
+from app.schemas.transaction import DepositWithdrawRequest, TransferRequest
+from app.services.shards import account_session
+from app.services.transaction import apply_deposit, apply_transfer
+
+pytestmark = pytest.mark.anyio
+
+async def _user_id(client, headers):
+    return (await client.get("/auth/me", headers=headers)).json()["id"]
+
+async def test_rejected_transfer_keeps_the_callers_earlier_writes(client, auth_headers, open_account, balance_of):
+    # the debit applies first, then the missing destination rejects the transfer
+    account_id = await open_account("100.00")
+    user_id = await _user_id(client, auth_headers)
+
+    async with account_session(account_id) as db:
+        await apply_deposit(db, DepositWithdrawRequest(account_id=account_id, amount=Decimal("10.00")), user_id)
+        with pytest.raises(HTTPException) as rejected:
+            await apply_transfer(
+                db, TransferRequest(from_account_id=account_id, to_account_id=10**9, amount=Decimal("40.00")), user_id
+            )
+        await db.commit()
+
+    assert rejected.value.status_code == 404
+    assert await balance_of(account_id) == Decimal("110.00")
+
+async def test_rejected_transfer_changes_no_balance(client, auth_headers, open_account, balance_of):
+    account_id = await open_account("100.00")
+
+    response = await client.post(
+        "/transactions/transfer",
+        json={"from_account_id": account_id, "to_account_id": 10**9, "amount": "40.00"},
+        headers=auth_headers
+    )
+
+    assert response.status_code == 404
+    assert await balance_of(account_id) == Decimal("100.00")
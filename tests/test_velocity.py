@@ -0,0 +1,54 @@
+from decimal import Decimal
+import pytest
+from app.schemas.transaction import DepositWithdrawRequest
+from app.services.shards import account_session
+from app.services.transaction import apply_withdraw
+from app.services.velocity import _parse_rules, velocity_limits
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def withdrawal_limit(monkeypatch):
+    monkeypatch.setattr(velocity_limits, "rules", _parse_rules("savings.withdrawal.1h=/100"))
+
+async def _withdraw(client, headers, account_id, amount):
+    return await client.post(
+        "/transactions/withdraw", json={"account_id": account_id, "amount": amount}, headers=headers
+    )
+
+async def test_hold_is_released_when_the_session_rolls_back(
+    client, auth_headers, open_account, balance_of, withdrawal_limit
+):
+    account_id = await open_account("500.00")
+    user_id = (await client.get("/auth/me", headers=auth_headers)).json()["id"]
+
+    async with account_session(account_id) as db:
+        await apply_withdraw(db, DepositWithdrawRequest(account_id=account_id, amount=Decimal("60.00")), user_id)
+        await db.rollback()
+
+    # had the 60.00 stayed held, 80.00 more would break the 100.00 limit
+    assert (await _withdraw(client, auth_headers, account_id, "80.00")).status_code == 200
+    assert await balance_of(account_id) == Decimal("420.00")
+
+async def test_hold_is_released_when_the_session_closes_uncommitted(
+    client, auth_headers, open_account, withdrawal_limit
+):
+    account_id = await open_account("500.00")
+    user_id = (await client.get("/auth/me", headers=auth_headers)).json()["id"]
+
+    async with account_session(account_id) as db:
+        await apply_withdraw(db, DepositWithdrawRequest(account_id=account_id, amount=Decimal("60.00")), user_id)
+
+    assert (await _withdraw(client, auth_headers, account_id, "80.00")).status_code == 200
+
+async def test_committed_withdrawals_count_against_the_limit(
+    client, auth_headers, open_account, balance_of, withdrawal_limit
+):
+    account_id = await open_account("500.00")
+
+    assert (await _withdraw(client, auth_headers, account_id, "80.00")).status_code == 200
+    response = await _withdraw(client, auth_headers, account_id, "30.00")
+
+    assert response.status_code == 400
+    assert "Limit of 100" in response.json()["detail"]
+    assert await balance_of(account_id) == Decimal("420.00")